@@ -0,0 +1,202 @@
+import argparse
+import json
+import os
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt6.QtWidgets import QApplication
+
+import main
+
+# Замеры органайзера без окна на экране: python benchmark.py [--sizes 100 10000] [--repeat 5] [--output result.jsonl]
+# Каждая строка вывода - JSON с именем замера, размером данных и временами повторов в секундах.
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+SUBJECTS = ["Математика", "Физика", "Литература", "История", "Химия", "Биология", "Информатика", "Английский"]
+WORDS = ("сочинение проект задание контрольная лабораторная реферат доклад презентация экзамен зачёт "
+         "курсовая глава параграф упражнение вариант тема").split()
+REVISION = None
+
+
+def current_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=APP_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def generate_data(directory, size, seed=1):
+    # данные в старом JSON-формате, чтобы заодно замерить перенос в базу
+    rng = random.Random(seed)
+    now = datetime.now()
+
+    def task(i):
+        deadline = now + timedelta(minutes=rng.randint(60, 365 * 24 * 60))
+        return {
+            "title": f"Задача {i}",
+            "deadline": deadline.strftime(main.DEADLINE_FORMAT),
+            "task_name": " ".join(rng.choices(WORDS, k=4)),
+            "subject": rng.choice(SUBJECTS)
+        }
+
+    split = size * 2 // 3
+    tasks = {"tasks": [task(i) for i in range(split)], "in_progress": [task(i) for i in range(split, size)]}
+    notes = [{
+        "title": f"Конспект {i}",
+        "subtitle": rng.choice(SUBJECTS),
+        "description": " ".join(rng.choices(WORDS, k=30)),
+        "image_path": None,
+        "favorite": rng.random() < 0.1,
+        "date_created": (now - timedelta(minutes=i)).strftime("%Y-%m-%d %H:%M")
+    } for i in range(size)]
+    calendar_notes = {(now - timedelta(days=i)).strftime("%Y-%m-%d"): " ".join(rng.choices(WORDS, k=12))
+                      for i in range(size)}
+
+    for name, data in (("tasks.json", tasks), ("notes.json", notes), ("notes_2.json", calendar_notes)):
+        with open(os.path.join(directory, name), "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=4)
+    for name in os.listdir(APP_DIR):
+        if name.endswith(".png"):
+            shutil.copy(os.path.join(APP_DIR, name), directory)
+
+
+def measure(function, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def report(results, output, name, size, times):
+    result = {"revision": REVISION, "benchmark": name, "size": size, "repeat": len(times), "median": statistics.median(times),
+              "min": min(times), "times": times}
+    results.append(result)
+    line = json.dumps(result, ensure_ascii=False)
+    print(line)
+    if output is not None:
+        output.write(line + "\n")
+        output.flush()
+
+
+def process_events(app, rounds=5):
+    for _ in range(rounds):
+        app.processEvents()
+
+
+def run_size(app, size, repeat, results, output):
+    directory = tempfile.mkdtemp(prefix=f"organizer-bench-{size}-")
+    cwd = os.getcwd()
+    try:
+        generate_data(directory, size)
+        os.chdir(directory)
+
+        report(results, output, "migrate_from_json", size, measure(main.get_database, 1))
+        db = main.get_database()
+
+        windows = []
+        report(results, output, "MainWindow.__init__", size, measure(lambda: windows.append(main.MainWindow()), 1))
+        window = windows[0]
+
+        def first_frame():
+            # repaint рисует синхронно, отложенное создание остальных страниц сюда не попадает
+            window.show()
+            window.repaint()
+        report(results, output, "MainWindow.show", size, measure(first_frame, 1))
+
+        def prewarm():
+            while window.prewarm_queue:
+                app.processEvents()
+        report(results, output, "MainWindow.prewarm", size, measure(prewarm, 1))
+
+        deadlines = window.page('   Цели')
+        report(results, output, "Deadlines.loadTasks", size, measure(deadlines.loadTasks, repeat))
+
+        task_ids = list(deadlines.store.tasks)[:100]
+
+        def edit_and_save():
+            for task_id in task_ids:
+                deadlines.store.update(task_id, title=f"Изменена {time.perf_counter()}")
+                deadlines.saveTasks()
+        report(results, output, "Deadlines.saveTasks x100", size, measure(edit_and_save, repeat))
+        report(results, output, "OrganizerDatabase.flush", size, measure(db.flush, 1))
+
+        def expire_and_check():
+            expired = datetime.now() - timedelta(minutes=1)
+            for task_id in list(deadlines.store.tasks)[:10]:
+                deadlines.store.update(task_id, deadline=expired)
+            deadlines.checkDeadlines()
+        report(results, output, "Deadlines.checkDeadlines", size, measure(expire_and_check, repeat))
+        report(results, output, "Deadlines.rescheduleAll", size, measure(deadlines.rescheduleAll, repeat))
+
+        def switch_filters():
+            # предмет + неделя по сроку, затем обратно ко всей доске
+            deadlines.subjectFilter.setCurrentIndex(1)
+            deadlines.periodFilter.setCurrentIndex(2)
+            deadlines.sortOrder.setCurrentIndex(1)
+            deadlines.resetFilter()
+            deadlines.sortOrder.setCurrentIndex(0)
+        report(results, output, "Deadlines.applyFilter x5", size, measure(switch_filters, repeat))
+
+        notes = window.page('Конспекты')
+        report(results, output, "NotesWidget.update_notes_list", size, measure(notes.update_notes_list, repeat))
+
+        calendar = window.page('Календарь')
+        window.changePage('Календарь')
+        process_events(app)
+
+        def switch_months():
+            for _ in range(12):
+                calendar.calendar.showPreviousMonth()
+                calendar.calendar.repaint()
+        report(results, output, "CalendarWidget month switch x12", size, measure(switch_months, repeat))
+
+        window.close()
+        db.close()
+        # последний committed потока записи ещё в очереди событий: он доходит до окон, пока база открыта,
+        # а потом окна этого размера отключаются от неё
+        process_events(app)
+        db.committed.disconnect()
+        db.conn.close()
+        main.DATABASE = None
+        main.DAY_INDEX = None
+        main.HISTORY = None
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def main_benchmark():
+    parser = argparse.ArgumentParser(description="Замеры производительности Study Organizer")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="дописать результаты в файл JSON Lines")
+    args = parser.parse_args()
+
+    global REVISION
+    REVISION = current_revision()
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    results = []
+    output = open(args.output, "a", encoding="utf-8") if args.output else None
+    try:
+        for size in args.sizes:
+            run_size(app, size, args.repeat, results, output)
+    finally:
+        if output is not None:
+            output.close()
+    return results
+
+
+if __name__ == "__main__":
+    main_benchmark()
@@ -1,33 +1,1250 @@
+import hashlib
+import heapq
+import inspect
+import itertools
+import math
+import os
 import random
+import re
+import queue
+import sqlite3
 import sys
 import json
-from datetime import datetime
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict, deque
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache, wraps
+
+import numpy as np
 
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QVBoxLayout, QHBoxLayout, QWidget, QLabel, QPushButton,
-                             QStackedWidget, QLineEdit, QTextEdit, QListWidget, QListWidgetItem, QFileDialog, QDialog,
-                             QDialogButtonBox, QMessageBox, QGridLayout, QScrollArea, QMenu, QFormLayout, QDateTimeEdit,
-                             QComboBox, QCalendarWidget)
-from PyQt6.QtCore import Qt, QSize, QPropertyAnimation, QRect, QPoint, pyqtSignal, QDateTime, QTimer
-from PyQt6.QtGui import QFont, QIcon, QPixmap, QAction
+                             QStackedWidget, QLineEdit, QTextEdit, QFileDialog, QDialog,
+                             QDialogButtonBox, QMessageBox, QGridLayout, QMenu, QFormLayout, QDateTimeEdit,
+                             QComboBox, QSpinBox, QDateEdit, QCalendarWidget, QListView, QStyledItemDelegate, QStyle, QCompleter,
+                             QSystemTrayIcon)
+from PyQt6.QtCore import (Qt, QSize, QPropertyAnimation, QRect, QRectF, QPoint, pyqtSignal, QDateTime, QDate, QTimer, QObject,
+                          QAbstractListModel, QModelIndex, QEvent, QRunnable, QThreadPool,
+                          QFileSystemWatcher)
+from PyQt6.QtGui import (QFont, QIcon, QPixmap, QAction, QPainter, QColor, QImage, QImageReader, QStandardItemModel,
+                         QStandardItem, QKeySequence)
+
+# Упрощённый стеммер Портера (Snowball) для русского языка
+RU_PERFECTIVE_GERUND = re.compile(r"((ив|ивши|ившись|ыв|ывши|ывшись)|((?<=[ая])(в|вши|вшись)))$")
+RU_REFLEXIVE = re.compile(r"(с[яь])$")
+RU_ADJECTIVE = re.compile(r"(ее|ие|ые|ое|ими|ыми|ей|ий|ый|ой|ем|им|ым|ом|его|ого|ему|ому|их|ых|ую|юю|ая|яя|ою|ею)$")
+RU_PARTICIPLE = re.compile(r"((ивш|ывш|ующ)|((?<=[ая])(ем|нн|вш|ющ|щ)))$")
+RU_VERB = re.compile(r"((ила|ыла|ена|ейте|уйте|ите|или|ыли|ей|уй|ил|ыл|им|ым|ен|ило|ыло|ено|ят|ует|уют|ит|ыт|ены|ить"
+                     r"|ыть|ишь|ую|ю)|((?<=[ая])(ла|на|ете|йте|ли|й|л|ем|н|ло|но|ет|ют|ны|ть|ешь|нно)))$")
+RU_NOUN = re.compile(r"(а|ев|ов|ие|ье|е|иями|ями|ами|еи|ии|и|ией|ей|ой|ий|й|иям|ям|ием|ем|ам|ом|о|у|ах|иях|ях|ы|ь|ию"
+                     r"|ью|ю|ия|ья|я)$")
+RU_DERIVATIONAL = re.compile(r"ость?$")
+RU_SUPERLATIVE = re.compile(r"(ейше|ейш)$")
+RU_RV = re.compile(r"^(.*?[аеиоуыэюя])(.*)$")
+WORD_RE = re.compile(r"\w+")
+
+
+@lru_cache(maxsize=100000)
+def stem_word(word):
+    word = word.replace('ё', 'е')
+    match = RU_RV.match(word)
+    if not match:
+        return word
+    start, rv = match.groups()
+    temp = RU_PERFECTIVE_GERUND.sub('', rv, 1)
+    if temp == rv:
+        rv = RU_REFLEXIVE.sub('', rv, 1)
+        temp = RU_ADJECTIVE.sub('', rv, 1)
+        if temp != rv:
+            rv = RU_PARTICIPLE.sub('', temp, 1)
+        else:
+            temp = RU_VERB.sub('', rv, 1)
+            rv = RU_NOUN.sub('', rv, 1) if temp == rv else temp
+    else:
+        rv = temp
+    if rv.endswith('и'):
+        rv = rv[:-1]
+    rv = RU_DERIVATIONAL.sub('', rv, 1)
+    if rv.endswith('ь'):
+        rv = rv[:-1]
+    else:
+        rv = RU_SUPERLATIVE.sub('', rv, 1)
+        if rv.endswith('нн'):
+            rv = rv[:-1]
+    return start + rv
 
-import json
-from PyQt6.QtWidgets import QWidget, QVBoxLayout, QCalendarWidget, QTextEdit, QPushButton
 
-import json
-from PyQt6.QtWidgets import QWidget, QVBoxLayout, QCalendarWidget, QTextEdit, QPushButton
+def tokenize(text):
+    return [stem_word(word) for word in WORD_RE.findall(text.lower())]
+
+
+def stem_text(text):
+    return " ".join(tokenize(text or ""))
+
+
+def deadline_to_db(deadline):
+    # в базе дедлайн хранится как 'гггг-мм-дд чч:мм', чтобы индекс сортировал его по времени
+    if isinstance(deadline, datetime):
+        return deadline.strftime('%Y-%m-%d %H:%M')
+    return deadline
+
+
+def deadline_from_db(value):
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return value
+
+
+DATABASE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY,
+    title TEXT NOT NULL,
+    deadline TEXT,
+    task_name TEXT NOT NULL,
+    subject TEXT NOT NULL,
+    column_name TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    effort INTEGER NOT NULL DEFAULT 1,
+    recurrence TEXT
+);
+CREATE INDEX IF NOT EXISTS tasks_position ON tasks(position);
+CREATE INDEX IF NOT EXISTS tasks_deadline ON tasks(deadline);
+CREATE INDEX IF NOT EXISTS tasks_subject ON tasks(subject);
+
+CREATE TABLE IF NOT EXISTS archived_tasks (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id INTEGER NOT NULL,
+    title TEXT NOT NULL,
+    deadline TEXT,
+    task_name TEXT NOT NULL,
+    subject TEXT NOT NULL,
+    source TEXT  -- 'id задачи@срок': две копии органайзера не заархивируют один дедлайн дважды
+);
+CREATE INDEX IF NOT EXISTS archived_tasks_id ON archived_tasks(id);
+CREATE INDEX IF NOT EXISTS archived_tasks_subject ON archived_tasks(subject);
+
+-- счётчики архива по предметам, чтобы заголовок архива не делал count(*)
+CREATE TABLE IF NOT EXISTS archive_subjects (subject TEXT PRIMARY KEY, count INTEGER NOT NULL);
+CREATE TRIGGER IF NOT EXISTS archived_tasks_count_ai AFTER INSERT ON archived_tasks BEGIN
+    INSERT INTO archive_subjects(subject, count) VALUES (new.subject, 1)
+        ON CONFLICT(subject) DO UPDATE SET count = count + 1;
+END;
+CREATE TRIGGER IF NOT EXISTS archived_tasks_count_ad AFTER DELETE ON archived_tasks BEGIN
+    UPDATE archive_subjects SET count = count - 1 WHERE subject = old.subject;
+    DELETE FROM archive_subjects WHERE subject = old.subject AND count <= 0;
+END;
+
+CREATE TABLE IF NOT EXISTS notes (
+    id INTEGER PRIMARY KEY,
+    title TEXT NOT NULL,
+    subtitle TEXT NOT NULL,
+    description TEXT NOT NULL,
+    image_path TEXT,
+    favorite INTEGER NOT NULL DEFAULT 0,
+    date_created TEXT
+);
+CREATE INDEX IF NOT EXISTS notes_favorite ON notes(favorite);
+
+CREATE TABLE IF NOT EXISTS calendar_notes (date TEXT PRIMARY KEY, text TEXT NOT NULL);
+
+-- UID задач из импортированных .ics: повторный импорт того же файла обновляет задачи, а не дублирует их
+CREATE TABLE IF NOT EXISTS ics_tasks (uid TEXT PRIMARY KEY, task_id INTEGER NOT NULL);
+
+CREATE TABLE IF NOT EXISTS achievements (name TEXT PRIMARY KEY, value INTEGER NOT NULL);
+
+-- журнал фаз помодоро, только добавление: конец фазы (unix time), длительность в секундах, 0 - работа / 1 - перерыв
+CREATE TABLE IF NOT EXISTS pomodoro_log (
+    ended REAL NOT NULL,
+    duration REAL NOT NULL,
+    kind INTEGER NOT NULL,
+    subject TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS pomodoro_log_ended ON pomodoro_log(ended);
+
+-- история отмены: на шаг одна дельта (JSON, только изменённые поля), undone = 1 - шаг отменён и ждёт повтора
+CREATE TABLE IF NOT EXISTS undo_log (
+    seq INTEGER PRIMARY KEY,
+    undone INTEGER NOT NULL DEFAULT 0,
+    label TEXT NOT NULL,
+    delta TEXT NOT NULL
+);
+
+-- журнал изменений для других копий органайзера, открытых на этой же базе: какой процесс (origin)
+-- поменял какую строку. Читатель перечитывает только упомянутые строки; записи старше суток удаляются сами,
+-- кто пропустил больше (например, спящий ноутбук), перечитывает всё.
+CREATE TABLE IF NOT EXISTS changes (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    origin TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    ref TEXT NOT NULL,
+    at REAL NOT NULL DEFAULT (julianday('now'))
+);
+CREATE TRIGGER IF NOT EXISTS changes_trim AFTER INSERT ON changes WHEN new.seq % 1000 = 0 BEGIN
+    DELETE FROM changes WHERE at < julianday('now') - 1;
+END;
+CREATE TRIGGER IF NOT EXISTS tasks_changes_ai AFTER INSERT ON tasks BEGIN
+    INSERT INTO changes(origin, kind, ref) VALUES (instance_id(), 'task', new.id);
+END;
+CREATE TRIGGER IF NOT EXISTS tasks_changes_au AFTER UPDATE ON tasks BEGIN
+    INSERT INTO changes(origin, kind, ref) VALUES (instance_id(), 'task', new.id);
+END;
+CREATE TRIGGER IF NOT EXISTS tasks_changes_ad AFTER DELETE ON tasks BEGIN
+    INSERT INTO changes(origin, kind, ref) VALUES (instance_id(), 'task', old.id);
+END;
+CREATE TRIGGER IF NOT EXISTS notes_changes_ai AFTER INSERT ON notes BEGIN
+    INSERT INTO changes(origin, kind, ref) VALUES (instance_id(), 'note', new.id);
+END;
+CREATE TRIGGER IF NOT EXISTS notes_changes_au AFTER UPDATE ON notes BEGIN
+    INSERT INTO changes(origin, kind, ref) VALUES (instance_id(), 'note', new.id);
+END;
+CREATE TRIGGER IF NOT EXISTS notes_changes_ad AFTER DELETE ON notes BEGIN
+    INSERT INTO changes(origin, kind, ref) VALUES (instance_id(), 'note', old.id);
+END;
+CREATE TRIGGER IF NOT EXISTS calendar_changes_ai AFTER INSERT ON calendar_notes BEGIN
+    INSERT INTO changes(origin, kind, ref) VALUES (instance_id(), 'day', new.date);
+END;
+CREATE TRIGGER IF NOT EXISTS calendar_changes_au AFTER UPDATE ON calendar_notes BEGIN
+    INSERT INTO changes(origin, kind, ref) VALUES (instance_id(), 'day', new.date);
+END;
+CREATE TRIGGER IF NOT EXISTS calendar_changes_ad AFTER DELETE ON calendar_notes BEGIN
+    INSERT INTO changes(origin, kind, ref) VALUES (instance_id(), 'day', old.date);
+END;
+CREATE TRIGGER IF NOT EXISTS archive_changes_ai AFTER INSERT ON archived_tasks BEGIN
+    INSERT INTO changes(origin, kind, ref) VALUES (instance_id(), 'archive', '');
+END;
+CREATE TRIGGER IF NOT EXISTS archive_changes_ad AFTER DELETE ON archived_tasks BEGIN
+    INSERT INTO changes(origin, kind, ref) VALUES (instance_id(), 'archive', '');
+END;
+"""
+
+# Полнотекстовый индекс. rowid = id записи * 4 + вид документа, поэтому удаление из индекса - поиск по ключу.
+# В body лежит текст после стемминга (stem_text), так что запросы учитывают русские окончания.
+SEARCH_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS search USING fts5(
+    kind UNINDEXED, ref UNINDEXED, title UNINDEXED, subtitle UNINDEXED, body, prefix='2 3'
+);
+
+CREATE TRIGGER IF NOT EXISTS tasks_search_ai AFTER INSERT ON tasks BEGIN
+    INSERT INTO search(rowid, kind, ref, title, subtitle, body)
+        VALUES (new.id * 4 + 1, 'task', new.id, new.title, new.subject,
+                stem_text(new.title || ' ' || new.subject || ' ' || new.task_name));
+END;
+CREATE TRIGGER IF NOT EXISTS tasks_search_au AFTER UPDATE OF title, subject, task_name ON tasks BEGIN
+    DELETE FROM search WHERE rowid = old.id * 4 + 1;
+    INSERT INTO search(rowid, kind, ref, title, subtitle, body)
+        VALUES (new.id * 4 + 1, 'task', new.id, new.title, new.subject,
+                stem_text(new.title || ' ' || new.subject || ' ' || new.task_name));
+END;
+CREATE TRIGGER IF NOT EXISTS tasks_search_ad AFTER DELETE ON tasks BEGIN
+    DELETE FROM search WHERE rowid = old.id * 4 + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS notes_search_ai AFTER INSERT ON notes BEGIN
+    INSERT INTO search(rowid, kind, ref, title, subtitle, body)
+        VALUES (new.id * 4 + 2, 'note', new.id, new.title, new.subtitle,
+                stem_text(new.title || ' ' || new.subtitle || ' ' || new.description));
+END;
+CREATE TRIGGER IF NOT EXISTS notes_search_au AFTER UPDATE OF title, subtitle, description ON notes BEGIN
+    DELETE FROM search WHERE rowid = old.id * 4 + 2;
+    INSERT INTO search(rowid, kind, ref, title, subtitle, body)
+        VALUES (new.id * 4 + 2, 'note', new.id, new.title, new.subtitle,
+                stem_text(new.title || ' ' || new.subtitle || ' ' || new.description));
+END;
+CREATE TRIGGER IF NOT EXISTS notes_search_ad AFTER DELETE ON notes BEGIN
+    DELETE FROM search WHERE rowid = old.id * 4 + 2;
+END;
+
+CREATE TRIGGER IF NOT EXISTS calendar_search_ai AFTER INSERT ON calendar_notes BEGIN
+    INSERT INTO search(rowid, kind, ref, title, subtitle, body)
+        VALUES (new.rowid * 4 + 3, 'day', new.date, new.date,
+                substr(new.text, 1, instr(new.text || char(10), char(10)) - 1), stem_text(new.text));
+END;
+CREATE TRIGGER IF NOT EXISTS calendar_search_au AFTER UPDATE OF text ON calendar_notes BEGIN
+    DELETE FROM search WHERE rowid = old.rowid * 4 + 3;
+    INSERT INTO search(rowid, kind, ref, title, subtitle, body)
+        VALUES (new.rowid * 4 + 3, 'day', new.date, new.date,
+                substr(new.text, 1, instr(new.text || char(10), char(10)) - 1), stem_text(new.text));
+END;
+CREATE TRIGGER IF NOT EXISTS calendar_search_ad AFTER DELETE ON calendar_notes BEGIN
+    DELETE FROM search WHERE rowid = old.rowid * 4 + 3;
+END;
+"""
+
+
+INSTANCE_ID = f"{os.getpid()}-{random.getrandbits(32):08x}"  # метка изменений этого процесса в журнале changes
+
+
+def merge_lines(text, addition):
+    # строки addition, которых ещё нет в text целиком, дописываются в конец
+    lines = text.split("\n") if text else []
+    seen = set(lines)
+    for line in addition.split("\n"):
+        if line not in seen:
+            lines.append(line)
+            seen.add(line)
+    return "\n".join(lines)
+
+
+def database_busy(error):
+    # база занята другим соединением дольше busy timeout; такая ошибка проходит сама, если повторить
+    return isinstance(error, sqlite3.OperationalError) and ("locked" in str(error) or "busy" in str(error))
+
+
+def connect_database(path, timeout=5.0):
+    conn = sqlite3.connect(path, timeout=timeout)  # timeout - это busy_timeout соединения, в секундах
+    conn.create_function("stem_text", 1, stem_text, deterministic=True)
+    conn.create_function("merge_lines", 2, merge_lines, deterministic=True)
+    conn.create_function("instance_id", 0, lambda: INSTANCE_ID)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class DatabaseWriter(threading.Thread):
+    # Все записи в базу выполняются здесь, а не в GUI-потоке. Пачки, пришедшие в течение
+    # COALESCE_DELAY, объединяются: для каждого ключа остаётся последняя запись, и всё фиксируется одной транзакцией.
+    COALESCE_DELAY = 0.05
+    BUSY_TIMEOUT = 2.0  # сколько одна попытка ждёт блокировку другого процесса
+    RETRY_DELAY = 0.5  # пауза перед повтором пачки, не записанной из-за блокировки
+    STOP_ATTEMPTS = 3  # при закрытии пачка повторяется ограниченно, чтобы окно не зависло
+
+    def __init__(self, path, committed):
+        super().__init__(name="DatabaseWriter", daemon=True)
+        self.path = path
+        self.committed = committed
+        self.queue = queue.Queue()
+
+    def submit(self, batch):
+        self.queue.put(batch)
+
+    def flush(self):
+        done = threading.Event()
+        self.queue.put(done)
+        done.wait()
+
+    def stop(self):
+        self.queue.put(None)
+        self.join()
+
+    def run(self):
+        conn = connect_database(self.path, self.BUSY_TIMEOUT)
+        operations = {}  # ещё не записанное; если база была занята, пачка ждёт здесь следующей попытки
+        waiting = []  # flush(), которые отпускаются только после записи
+        running = True
+        while running:
+            items = []
+            try:
+                items.append(self.queue.get(timeout=self.RETRY_DELAY if operations else None))
+            except queue.Empty:
+                pass
+            deadline = time.monotonic() + self.COALESCE_DELAY
+            while items and items[-1] is not None and not isinstance(items[-1], threading.Event):
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    items.append(self.queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+
+            for item in items:
+                if item is None:
+                    running = False
+                elif isinstance(item, threading.Event):
+                    waiting.append(item)
+                else:
+                    for key, sql, params in item:
+                        if key is None:
+                            key = object()
+                        operations[key] = (sql, params)  # более поздняя запись того же объекта заменяет раннюю
+            attempts = 1 if running else self.STOP_ATTEMPTS
+            while operations and attempts:
+                attempts -= 1
+                if self.write(conn, operations):
+                    operations = {}
+                elif attempts:
+                    time.sleep(self.RETRY_DELAY)
+            if not operations:
+                for event in waiting:
+                    event.set()
+                waiting.clear()
+        for event in waiting:
+            event.set()
+        conn.close()
+
+    def write(self, conn, operations):
+        # False - база занята, незаписанное остаётся в operations для повтора
+        try:
+            with conn:
+                self.execute(conn, operations.values())
+        except sqlite3.Error as e:
+            if database_busy(e):
+                print(f"База занята, запись будет повторена: {e}")
+                return False
+            # ошибка в самой записи: остальные пишутся по одной, теряется только ошибочная
+            print(f"Ошибка при записи в базу: {e}")
+            for key, operation in list(operations.items()):
+                try:
+                    with conn:
+                        self.execute(conn, [operation])
+                except sqlite3.Error as e:
+                    if database_busy(e):
+                        return False  # записанное уже убрано из operations и не повторится
+                    print(f"Ошибка при записи в базу: {e}")
+                del operations[key]
+        self.committed.emit()
+        return True
+
+    @staticmethod
+    def execute(conn, operations):
+        for sql, params in operations:
+            if isinstance(params, list):
+                conn.executemany(sql, params)
+            else:
+                conn.execute(sql, params)
+
+
+class SearchWorker(threading.Thread):
+    # Поиск на своём соединении: в WAL чтение не ждёт ни GUI-поток, ни DatabaseWriter.
+    # Из очереди берётся только последний запрос, промежуточные при быстром наборе пропускаются.
+    def __init__(self, path, has_fts, found):
+        super().__init__(name="SearchWorker", daemon=True)
+        self.path = path
+        self.has_fts = has_fts
+        self.found = found
+        self.queue = queue.Queue()
+
+    def submit(self, query):
+        self.queue.put(query)
+
+    def stop(self):
+        self.queue.put(None)
+        self.join()
+
+    def run(self):
+        conn = connect_database(self.path)
+        while True:
+            query = self.queue.get()
+            while query is not None and not self.queue.empty():
+                query = self.queue.get()
+            if query is None:
+                break
+            try:
+                self.found.emit(query, search_database(conn, self.has_fts, query))
+            except sqlite3.Error as e:
+                print(f"Ошибка поиска: {e}")
+        conn.close()
+
+
+SEARCH_CANDIDATES = 1000
+
+
+def search_database(conn, has_fts, query, limit=20):
+    words = [stem_word(word) for word in dict.fromkeys(WORD_RE.findall(query.lower()))]
+    if not words:
+        return []
+    if has_fts:
+        # Сначала дешёвая проверка с LIMIT: если совпадений больше SEARCH_CANDIDATES (первые буквы слова),
+        # bm25 по всем совпадениям стоил бы сотни миллисекунд, поэтому показываются самые новые записи.
+        match = " AND ".join(f'"{word}"*' for word in words)
+        candidates = conn.execute("SELECT count(*) FROM (SELECT 1 FROM search WHERE search MATCH ? LIMIT ?)",
+                                  (match, SEARCH_CANDIDATES + 1)).fetchone()[0]
+        if candidates > SEARCH_CANDIDATES:
+            rows = conn.execute("SELECT kind, ref, title, subtitle, 0.0 FROM search WHERE search MATCH ? "
+                                "ORDER BY rowid DESC LIMIT ?", (match, limit))
+        else:
+            rows = conn.execute("SELECT kind, ref, title, subtitle, bm25(search) FROM search WHERE search MATCH ? "
+                                "ORDER BY bm25(search) LIMIT ?", (match, limit))
+        return [((kind, ref), title, subtitle, -score) for kind, ref, title, subtitle, score in rows]
+
+    # запасной вариант без FTS5 - полный просмотр таблиц
+    condition = " AND ".join("stem_text(body) LIKE ?" for word in words)
+    patterns = [f"%{word}%" for word in words]
+    rows = conn.execute(f"""
+        SELECT kind, ref, title, subtitle FROM (
+            SELECT 'task' AS kind, id AS ref, title, subject AS subtitle,
+                   title || ' ' || subject || ' ' || task_name AS body FROM tasks
+            UNION ALL
+            SELECT 'note', id, title, subtitle, title || ' ' || subtitle || ' ' || description FROM notes
+            UNION ALL
+            SELECT 'day', date, date, '', text FROM calendar_notes
+        ) WHERE {condition} LIMIT ?""", patterns + [limit])
+    return [((kind, ref), title, subtitle, 0.0) for kind, ref, title, subtitle in rows]
+
+
+class OrganizerDatabase(QObject):
+    # Единое хранилище органайзера в SQLite (WAL). GUI-поток только читает; записи копятся в pending
+    # и по commit() уходят неизменяемой пачкой в поток DatabaseWriter.
+    committed = pyqtSignal()
+    searchFinished = pyqtSignal(str, list)  # запрос, результаты
+
+    BUSY_TIMEOUT = 5.0  # для чтения в WAL не нужен, ждут только схема при запуске и allocate_ids
+
+    def __init__(self, path="organizer.db", parent=None):
+        super().__init__(parent)
+        self.path = path
+        self.conn = connect_database(path, self.BUSY_TIMEOUT)
+        self.conn.executescript(DATABASE_SCHEMA)
+        try:
+            self.conn.executescript(SEARCH_SCHEMA)
+            self.has_fts = True
+        except sqlite3.OperationalError:
+            print("SQLite собран без FTS5, поиск будет работать медленнее.")
+            self.has_fts = False
+        task_columns = {row[1] for row in self.conn.execute("PRAGMA table_info(tasks)")}
+        if "effort" not in task_columns:
+            self.conn.execute("ALTER TABLE tasks ADD COLUMN effort INTEGER NOT NULL DEFAULT 1")
+        if "recurrence" not in task_columns:
+            self.conn.execute("ALTER TABLE tasks ADD COLUMN recurrence TEXT")
+        if "source" not in {row[1] for row in self.conn.execute("PRAGMA table_info(archived_tasks)")}:
+            self.conn.execute("ALTER TABLE archived_tasks ADD COLUMN source TEXT")
+        self.conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS archived_tasks_source ON archived_tasks(source)")
+        self.conn.commit()
+        self.next_note_id = self.conn.execute("SELECT coalesce(max(id), 0) + 1 FROM notes").fetchone()[0]
+        self.note_id_limit = 0
+        self.last_change = self.conn.execute("SELECT coalesce(max(seq), 0) FROM changes").fetchone()[0]
+        self.data_version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+
+        self.pending = []
+        self.writer = DatabaseWriter(path, self.committed)
+        self.writer.start()
+        self.searcher = None
+        self.watcher = ChangeWatcher(self)
+        app = QApplication.instance()
+        if app is not None:
+            app.aboutToQuit.connect(self.close)
+
+    def write(self, key, sql, params=()):
+        # key - что именно перезаписывается; записи с одинаковым ключом в одной пачке схлопываются
+        self.pending.append((key, sql, params))
+
+    def commit(self):
+        if self.pending:
+            self.writer.submit(tuple(self.pending))
+            self.pending = []
+
+    def flush(self):
+        # дождаться, пока всё отправленное окажется на диске
+        self.commit()
+        self.writer.flush()
+
+    def close(self):
+        self.watcher.stop()
+        if self.searcher is not None:
+            self.searcher.stop()
+            self.searcher = None
+        if self.writer.is_alive():
+            self.commit()
+            self.writer.stop()
+
+    ID_BLOCK = 64
+    ALLOCATE_TIMEOUT = 250  # мс, сколько GUI-поток ждёт блокировку за одну попытку
+    ALLOCATE_ATTEMPTS = 4
+
+    def allocate_ids(self, key, minimum, count=ID_BLOCK):
+        # Блок id из общего счётчика в meta. Транзакция IMMEDIATE делает выдачу атомарной для всех
+        # процессов на этой базе, так что две копии органайзера не создадут записи с одним id.
+        # Вызывается из GUI-потока, поэтому блокировку ждёт недолго; если база так и осталась занята,
+        # бросает sqlite3.OperationalError, и вызывающий откладывает действие (см. database_busy).
+        self.conn.execute(f"PRAGMA busy_timeout = {self.ALLOCATE_TIMEOUT}")
+        try:
+            for attempt in range(self.ALLOCATE_ATTEMPTS):
+                try:
+                    self.conn.execute("BEGIN IMMEDIATE")
+                    break
+                except sqlite3.OperationalError as e:
+                    if not database_busy(e) or attempt + 1 == self.ALLOCATE_ATTEMPTS:
+                        raise
+        finally:
+            self.conn.execute(f"PRAGMA busy_timeout = {int(self.BUSY_TIMEOUT * 1000)}")
+        try:
+            row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+            start = max(int(row[0]) if row else 1, minimum)
+            self.conn.execute("INSERT INTO meta(key, value) VALUES (?, ?) "
+                              "ON CONFLICT(key) DO UPDATE SET value = excluded.value", (key, str(start + count)))
+            self.conn.commit()
+        except BaseException:
+            self.conn.rollback()
+            raise
+        return start, start + count
+
+    def remote_changes(self):
+        # Изменения других процессов после прошлой проверки: {вид: [ссылки]}. None - журнал уже обрезан
+        # дальше прочитанного места, и нужна полная перезагрузка.
+        version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+        if version == self.data_version:
+            return {}
+        self.data_version = version
+        first, latest = self.conn.execute("SELECT min(seq), coalesce(max(seq), 0) FROM changes").fetchone()
+        resync = first is not None and first > self.last_change + 1
+        changes = {}
+        rows = self.conn.execute("SELECT kind, ref FROM changes WHERE seq > ? AND seq <= ? AND origin != ? ORDER BY seq",
+                                 (self.last_change, latest, INSTANCE_ID))
+        for kind, ref in rows:
+            changes.setdefault(kind, {})[ref] = None
+        self.last_change = latest
+        return None if resync else {kind: list(refs) for kind, refs in changes.items()}
+
+    def get_meta(self, key, default=None):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def set_meta(self, key, value):
+        self.write(("meta", key), "INSERT INTO meta(key, value) VALUES (?, ?) "
+                   "ON CONFLICT(key) DO UPDATE SET value = excluded.value", (key, str(value)))
+
+    # --- задачи ---
+
+    def load_tasks(self):
+        data = {column: [] for column in COLUMN_TITLES}
+        rows = self.conn.execute(
+            "SELECT id, title, deadline, task_name, subject, column_name, effort, recurrence FROM tasks ORDER BY position")
+        for task_id, title, deadline, task_name, subject, column, effort, recurrence in rows:
+            data[column].append({"id": task_id, "title": title, "deadline": deadline_from_db(deadline),
+                                 "task_name": task_name, "subject": subject, "effort": effort,
+                                 "recurrence": recurrence})
+        data["next_id"] = self.next_task_id()
+        return data
+
+    def load_tasks_by_id(self, task_ids):
+        rows = self.conn.execute(
+            "SELECT id, title, deadline, task_name, subject, column_name, effort, recurrence FROM tasks "
+            "WHERE id IN (SELECT value FROM json_each(?))", (json.dumps(task_ids),))
+        return {task_id: Task(task_id, title, deadline_from_db(deadline), task_name, subject, column, effort,
+                              Recurrence.parse(recurrence))
+                for task_id, title, deadline, task_name, subject, column, effort, recurrence in rows}
+
+    def next_task_id(self):
+        row = self.conn.execute(
+            "SELECT max(coalesce((SELECT max(id) FROM tasks), 0), coalesce((SELECT max(id) FROM archived_tasks), 0))"
+        ).fetchone()
+        return max(row[0] + 1, int(self.get_meta("next_task_id", 1)))
+
+    PUT_TASK_SQL = """
+        INSERT INTO tasks(id, title, deadline, task_name, subject, column_name, effort, recurrence, position)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, (SELECT coalesce(max(position), 0) + 1 FROM tasks))
+        ON CONFLICT(id) DO UPDATE SET
+            title = excluded.title, deadline = excluded.deadline, task_name = excluded.task_name,
+            subject = excluded.subject, column_name = excluded.column_name, effort = excluded.effort,
+            recurrence = excluded.recurrence,
+            position = CASE WHEN tasks.column_name = excluded.column_name THEN tasks.position
+                            ELSE excluded.position END
+    """
+
+    @staticmethod
+    def task_params(task):
+        return (task.id, task.title, deadline_to_db(task.deadline), task.task_name, task.subject, task.column,
+                task.effort, task.recurrence.rule() if task.recurrence is not None else None)
+
+    def put_task(self, task):
+        # при переносе в другую колонку задача встаёт в её конец, как и на доске
+        self.write(("task", task.id), self.PUT_TASK_SQL, self.task_params(task))
+
+    def put_tasks(self, tasks):
+        self.write(None, self.PUT_TASK_SQL, [self.task_params(task) for task in tasks])
+
+    def delete_task(self, task_id):
+        self.write(("task", task_id), "DELETE FROM tasks WHERE id = ?", (task_id,))
+
+    def archive_tasks(self, tasks, source_ids=None):
+        # source_ids - id исходных задач, если архивируются экземпляры повторяющейся задачи
+        if source_ids is None:
+            source_ids = [task.id for task in tasks]
+        self.write(None,
+            "INSERT OR IGNORE INTO archived_tasks(id, title, deadline, task_name, subject, source) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            [(task.id, task.title, deadline_to_db(task.deadline), task.task_name, task.subject,
+              f"{source_id}@{deadline_to_db(task.deadline)}") for task, source_id in zip(tasks, source_ids)])
+
+    def archive_summary(self):
+        subjects = self.conn.execute("SELECT subject, count FROM archive_subjects ORDER BY count DESC").fetchall()
+        return sum(count for subject, count in subjects), subjects
+
+    def archive_page(self, after_seq, limit):
+        rows = self.conn.execute(
+            "SELECT seq, id, title, deadline, task_name, subject FROM archived_tasks WHERE seq > ? ORDER BY seq LIMIT ?",
+            (after_seq, limit))
+        return [(seq, Task(task_id, title, deadline_from_db(deadline), task_name, subject, "archived"))
+                for seq, task_id, title, deadline, task_name, subject in rows]
+
+    def delete_archived_task(self, task_id):
+        self.write(None, "DELETE FROM archived_tasks WHERE id = ?", (task_id,))
+
+    # --- конспекты ---
+
+    def load_notes(self):
+        rows = self.conn.execute(
+            "SELECT id, title, subtitle, description, image_path, favorite, date_created FROM notes "
+            "ORDER BY favorite DESC, id")
+        return [{"id": note_id, "title": title, "subtitle": subtitle, "description": description,
+                 "image_path": image_path, "favorite": bool(favorite), "date_created": date_created}
+                for note_id, title, subtitle, description, image_path, favorite, date_created in rows]
+
+    def load_notes_by_id(self, note_ids):
+        rows = self.conn.execute(
+            "SELECT id, title, subtitle, description, image_path, favorite, date_created FROM notes "
+            "WHERE id IN (SELECT value FROM json_each(?))", (json.dumps(note_ids),))
+        return {note_id: Note(title, subtitle, description, image_path, bool(favorite), date_created, note_id)
+                for note_id, title, subtitle, description, image_path, favorite, date_created in rows}
+
+    def save_note(self, note):
+        if note.id is None:
+            if self.next_note_id >= self.note_id_limit:
+                self.next_note_id, self.note_id_limit = self.allocate_ids("next_note_id", self.next_note_id)
+            note.id = self.next_note_id
+        self.next_note_id = max(self.next_note_id, note.id + 1)
+        self.write(("note", note.id), """
+            INSERT INTO notes(id, title, subtitle, description, image_path, favorite, date_created)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(id) DO UPDATE SET
+                title = excluded.title, subtitle = excluded.subtitle, description = excluded.description,
+                image_path = excluded.image_path, favorite = excluded.favorite, date_created = excluded.date_created
+        """, (note.id, note.title, note.subtitle, note.description, note.image_path, int(note.favorite),
+              note.date_created))
+
+    def delete_note(self, note_id):
+        self.write(("note", note_id), "DELETE FROM notes WHERE id = ?", (note_id,))
+
+    # --- календарь ---
+
+    def load_calendar_month(self, year, month):
+        # заметки одного месяца - диапазон по первичному ключу 'гггг-мм-дд'
+        next_year, next_month = (year + 1, 1) if month == 12 else (year, month + 1)
+        return dict(self.conn.execute("SELECT date, text FROM calendar_notes WHERE date >= ? AND date < ?",
+                                      (f"{year:04d}-{month:02d}-01", f"{next_year:04d}-{next_month:02d}-01")))
+
+    def save_calendar_note(self, date, text):
+        if text:
+            self.write(("day", date), "INSERT INTO calendar_notes(date, text) VALUES (?, ?) "
+                       "ON CONFLICT(date) DO UPDATE SET text = excluded.text", (date, text))
+        else:
+            self.write(("day", date), "DELETE FROM calendar_notes WHERE date = ?", (date,))
+
+    def append_calendar_notes(self, rows):
+        # импорт дописывает строки к заметке дня прямо в базе: памяти нужно на порцию, а не на весь файл,
+        # и не бывает расхождения с ещё не записанной предыдущей порцией
+        self.write(None, "INSERT INTO calendar_notes(date, text) VALUES (?, ?) "
+                   "ON CONFLICT(date) DO UPDATE SET text = merge_lines(calendar_notes.text, excluded.text) "
+                   "WHERE merge_lines(calendar_notes.text, excluded.text) != calendar_notes.text", rows)
+
+    def ics_task_ids(self, uids):
+        return dict(self.conn.execute("SELECT uid, task_id FROM ics_tasks WHERE uid IN (SELECT value FROM json_each(?))",
+                                      (json.dumps(uids),)))
+
+    def save_ics_task_ids(self, rows):
+        self.write(None, "INSERT INTO ics_tasks(uid, task_id) VALUES (?, ?) "
+                   "ON CONFLICT(uid) DO UPDATE SET task_id = excluded.task_id", rows)
+
+    def load_calendar_notes(self, dates):
+        return dict(self.conn.execute("SELECT date, text FROM calendar_notes WHERE date IN (SELECT value FROM json_each(?))",
+                                      (json.dumps(dates),)))
+
+    def iter_calendar_notes(self):
+        return self.conn.execute("SELECT date, text FROM calendar_notes ORDER BY date")
+
+    # --- помодоро ---
+
+    def load_achievements(self):
+        return dict(self.conn.execute("SELECT name, value FROM achievements"))
+
+    def save_achievements(self, achievements):
+        self.write(("achievements",), "INSERT INTO achievements(name, value) VALUES (?, ?) "
+                   "ON CONFLICT(name) DO UPDATE SET value = excluded.value", list(achievements.items()))
+
+    def log_pomodoro_phase(self, ended, duration, kind, subject):
+        self.write(None, "INSERT INTO pomodoro_log(ended, duration, kind, subject) VALUES (?, ?, ?, ?)",
+                   (ended, duration, kind, subject))
+
+    def load_pomodoro_log(self):
+        # журнал читается целиком в столбцы numpy, дальше вся статистика считается векторно
+        rows = self.conn.execute("SELECT ended, duration, kind, subject FROM pomodoro_log ORDER BY ended").fetchall()
+        if not rows:
+            return (np.empty(0), np.empty(0), np.empty(0, dtype=np.int8), np.empty(0, dtype=np.intp), [])
+        ended, duration, kind, subject = zip(*rows)
+        subjects, subject_codes = np.unique(np.array(subject, dtype=object), return_inverse=True)
+        return (np.array(ended, dtype=np.float64), np.array(duration, dtype=np.float64),
+                np.array(kind, dtype=np.int8), subject_codes.ravel(), list(subjects))
+
+    # --- история отмены ---
+
+    def load_undo_log(self):
+        return self.conn.execute("SELECT seq, undone, label, delta FROM undo_log ORDER BY seq").fetchall()
+
+    def save_undo_step(self, seq, undone, label, delta):
+        self.write(("undo", seq), "INSERT INTO undo_log(seq, undone, label, delta) VALUES (?, ?, ?, ?) "
+                   "ON CONFLICT(seq) DO UPDATE SET undone = excluded.undone", (seq, int(undone), label, delta))
+
+    def trim_undo_log(self, seqs):
+        # удаляются только перечисленные шаги: строки другого запущенного окна остаются его истории
+        self.write(None, "DELETE FROM undo_log WHERE seq IN (SELECT value FROM json_each(?))", (json.dumps(seqs),))
+
+    def task_subjects(self):
+        return [subject for subject, in self.conn.execute("SELECT DISTINCT subject FROM tasks ORDER BY subject")]
+
+    # --- поиск ---
+
+    def search(self, query, limit=20):
+        return search_database(self.conn, self.has_fts, query, limit)
+
+    def search_async(self, query):
+        # результат придёт сигналом searchFinished, поток поиска создаётся при первом запросе
+        if self.searcher is None:
+            self.searcher = SearchWorker(self.path, self.has_fts, self.searchFinished)
+            self.searcher.start()
+        self.searcher.submit(query)
+
+    # --- перенос из JSON ---
+
+    def migrate_from_json(self):
+        # одноразовый перенос tasks.json, notes.json, notes_2.json, achievements.json
+        if self.get_meta("migrated"):
+            return
+        try:
+            with open('tasks.json', 'r', encoding='utf-8') as f:
+                tasks_data = json.load(f)
+        except FileNotFoundError:
+            tasks_data = {}
+        except json.JSONDecodeError:
+            print("Ошибка при чтении tasks.json. Задачи не перенесены.")
+            tasks_data = {}
+        store = TaskStore()
+        store.load_dict(tasks_data)
+        for column in COLUMN_TITLES:
+            for task in store.column(column):
+                self.put_task(task)
+
+        archived = []
+        for task_data in tasks_data.get("archived", []):
+            task_id = task_data.get("id")
+            if not isinstance(task_id, int):
+                task_id = store.next_id
+                store.next_id += 1
+            archived.append(Task.from_dict(task_id, task_data, "archived"))
+        self.archive_tasks(archived)
+        self.set_meta("next_task_id", store.next_id)
+
+        for path, loader in (('notes.json', self.migrate_notes), ('notes_2.json', self.migrate_calendar_notes),
+                             ('achievements.json', self.save_achievements)):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    loader(json.load(f))
+            except FileNotFoundError:
+                pass
+            except (json.JSONDecodeError, KeyError, TypeError) as e:
+                print(f"Не удалось перенести {path}: {e}")
+
+        self.set_meta("migrated", 1)
+        self.flush()
+
+    def migrate_notes(self, notes_data):
+        for note_data in notes_data:
+            self.save_note(Note.from_dict(note_data))
+
+    def migrate_calendar_notes(self, notes):
+        for date, text in notes.items():
+            self.save_calendar_note(date, text)
+
+
+class ChangeWatcher(QObject):
+    # Следит за файлами базы: другая копия органайзера на той же базе пишет в них (в основном в WAL).
+    # Через POLL_DELAY после уведомления читается журнал changes, и наружу уходят только изменённые ссылки.
+    POLL_DELAY = 100
+    FALLBACK_INTERVAL = 5000  # сетевые папки присылают уведомления не всегда
+
+    tasksChanged = pyqtSignal(list)
+    notesChanged = pyqtSignal(list)
+    calendarChanged = pyqtSignal(list)
+    archiveChanged = pyqtSignal()
+    resyncNeeded = pyqtSignal()
+
+    def __init__(self, db):
+        super().__init__(db)
+        self.db = db
+        self.paths = [os.path.abspath(db.path), os.path.abspath(db.path) + "-wal"]
+        self.watcher = QFileSystemWatcher(self)
+        self.watcher.fileChanged.connect(self.schedule)
+        self.watch()
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.poll)
+        self.fallback = QTimer(self)
+        self.fallback.setTimerType(Qt.TimerType.VeryCoarseTimer)
+        self.fallback.timeout.connect(self.poll)
+        self.fallback.start(self.FALLBACK_INTERVAL)
+
+    def watch(self):
+        # WAL удаляется и создаётся заново, после этого наблюдение за ним нужно вернуть
+        watched = self.watcher.files()
+        missing = [path for path in self.paths if path not in watched and os.path.exists(path)]
+        if missing:
+            self.watcher.addPaths(missing)
+
+    def schedule(self, path=None):
+        self.watch()
+        if not self.timer.isActive():
+            self.timer.start(self.POLL_DELAY)
+
+    def stop(self):
+        self.timer.stop()
+        self.fallback.stop()
+
+    def poll(self):
+        try:
+            changes = self.db.remote_changes()
+        except sqlite3.Error as e:
+            print(f"Ошибка при чтении журнала изменений: {e}")
+            return
+        if changes is None:
+            self.db.flush()
+            self.resyncNeeded.emit()
+            return
+        if not changes:
+            return
+        # свои ещё не записанные правки сначала уходят в базу, иначе чужая строка в памяти
+        # расходилась бы с тем, что окажется на диске после нашей записи
+        self.db.flush()
+        if "task" in changes:
+            self.tasksChanged.emit([int(ref) for ref in changes["task"]])
+        if "note" in changes:
+            self.notesChanged.emit([int(ref) for ref in changes["note"]])
+        if "day" in changes:
+            self.calendarChanged.emit(changes["day"])
+        if "archive" in changes:
+            self.archiveChanged.emit()
+
+
+DATABASE = None
+
+
+def get_database():
+    global DATABASE
+    if DATABASE is None:
+        DATABASE = OrganizerDatabase()
+        DATABASE.migrate_from_json()
+    return DATABASE
+
+
+JULIAN_DAY_OFFSET = 1721425  # QDate.toJulianDay() - date.toordinal()
+
+
+class DayIndex(QObject):
+    # Что есть в каждом дне: заметка календаря и число дедлайнов задач. Ключ - юлианский день,
+    # как у QDate.toJulianDay(), чтобы календарь при отрисовке ячейки обходился одним поиском в dict.
+    dayChanged = pyqtSignal(int)
+    indexReset = pyqtSignal()
+    notesImported = pyqtSignal()
+
+    SERIES_BLOCK = 64  # дней в блоке раскладки повторов; видимый месяц задевает не больше двух блоков
+    SERIES_BLOCKS = 16
+
+    def __init__(self, db, parent=None):
+        super().__init__(parent)
+        self.db = db
+        self.deadlines = {}
+        self.task_days = {}
+        self.series = {}  # id -> (день первого срока, шаг в днях, последний день или None)
+        self.series_blocks = {}  # номер блока -> {день: число повторов}; сбрасывается при изменении серий
+        self.notes = set()
+        self.load()
+        # правки другой копии органайзера: страницы задач и календаря могут быть ещё не созданы
+        db.watcher.tasksChanged.connect(self.apply_remote_tasks)
+        db.watcher.calendarChanged.connect(self.apply_remote_notes)
+        db.watcher.resyncNeeded.connect(self.reload)
+
+    def load(self):
+        self.deadlines.clear()
+        self.task_days.clear()
+        self.series.clear()
+        self.series_blocks.clear()
+        for task_id, deadline, recurrence in self.db.conn.execute("SELECT id, deadline, recurrence FROM tasks"):
+            deadline = deadline_from_db(deadline)
+            self.add_task_day(task_id, self.julian(deadline))
+            self.add_series(task_id, deadline, Recurrence.parse(recurrence))
+        self.notes = {self.julian(date) for date, in self.db.conn.execute("SELECT date FROM calendar_notes")}
+        self.notes.discard(None)
+
+    def reload(self):
+        self.load()
+        self.indexReset.emit()
+
+    def apply_remote_tasks(self, task_ids):
+        tasks = self.db.load_tasks_by_id(task_ids)
+        for task_id in task_ids:
+            task = tasks.get(task_id)
+            if task is None:
+                self.remove_task(task_id)
+            else:
+                self.set_task(task_id, task.deadline, task.recurrence)
+
+    def apply_remote_notes(self, dates):
+        texts = self.db.load_calendar_notes(dates)
+        for date in dates:
+            self.set_note(date, bool(texts.get(date)))
+
+    @staticmethod
+    def julian(value):
+        try:
+            if isinstance(value, datetime):
+                return value.toordinal() + JULIAN_DAY_OFFSET
+            return datetime.strptime(value, "%Y-%m-%d").toordinal() + JULIAN_DAY_OFFSET
+        except (TypeError, ValueError):
+            return None  # дедлайн без даты в календаре не показывается
+
+    def markers(self, day):
+        count = self.deadlines.get(day, 0) + self.series_block(day // self.SERIES_BLOCK).get(day, 0)
+        return day in self.notes, count
+
+    def series_block(self, block):
+        # повторы раскладываются по дням только для блока, который сейчас рисуется, один раз на блок,
+        # а не проверкой каждой серии в каждой ячейке
+        counts = self.series_blocks.get(block)
+        if counts is None:
+            if len(self.series_blocks) >= self.SERIES_BLOCKS:
+                self.series_blocks.clear()
+            start = block * self.SERIES_BLOCK
+            end = start + self.SERIES_BLOCK
+            counts = {}
+            for first, step, last in self.series.values():
+                day = first + step * max(1, -((first - start) // step))  # первый повтор не раньше start
+                stop = end if last is None else min(end, last + 1)
+                while day < stop:
+                    counts[day] = counts.get(day, 0) + 1
+                    day += step
+            self.series_blocks[block] = counts
+        return counts
+
+    def add_series(self, task_id, deadline, recurrence):
+        day = self.julian(deadline)
+        if recurrence is None or day is None:
+            return
+        last = recurrence.last(deadline)
+        self.series[task_id] = (day, recurrence.days, None if last is None else self.julian(last))
+
+    def add_task_day(self, task_id, day):
+        if day is not None:
+            self.task_days[task_id] = day
+            self.deadlines[day] = self.deadlines.get(day, 0) + 1
+
+    def remove_task(self, task_id):
+        if self.series.pop(task_id, None) is not None:
+            self.series_blocks.clear()
+            self.indexReset.emit()
+        self.remove_task_day(task_id)
+
+    def remove_task_day(self, task_id):
+        day = self.task_days.pop(task_id, None)
+        if day is not None:
+            count = self.deadlines[day] - 1
+            if count:
+                self.deadlines[day] = count
+            else:
+                del self.deadlines[day]
+            self.dayChanged.emit(day)
+
+    def set_task(self, task_id, deadline, recurrence=None):
+        series = self.series.get(task_id)
+        day = self.julian(deadline)
+        if self.task_days.get(task_id) != day:
+            self.remove_task_day(task_id)
+            self.add_task_day(task_id, day)
+            if day is not None:
+                self.dayChanged.emit(day)
+        self.series.pop(task_id, None)
+        self.add_series(task_id, deadline, recurrence)
+        if self.series.get(task_id) != series:
+            self.series_blocks.clear()
+            self.indexReset.emit()  # повтор меняет сразу много дней
+
+    def reset_tasks(self, tasks):
+        self.deadlines.clear()
+        self.task_days.clear()
+        self.series.clear()
+        self.series_blocks.clear()
+        for task in tasks:
+            self.add_task_day(task.id, self.julian(task.deadline))
+            self.add_series(task.id, task.deadline, task.recurrence)
+        self.indexReset.emit()
+
+    def add_notes(self, dates):
+        self.notes.update(day for day in map(self.julian, dates) if day is not None)
+        self.indexReset.emit()
+        self.notesImported.emit()
+
+    def set_note(self, date, has_text):
+        day = self.julian(date)
+        if day is None or (day in self.notes) == has_text:
+            return
+        if has_text:
+            self.notes.add(day)
+        else:
+            self.notes.discard(day)
+        self.dayChanged.emit(day)
+
+
+DAY_INDEX = None
+
+
+def get_day_index():
+    global DAY_INDEX
+    if DAY_INDEX is None:
+        DAY_INDEX = DayIndex(get_database())
+    return DAY_INDEX
+
+
+class UndoHistory(QObject):
+    # Отмена и повтор действий с задачами и конспектами. Шаг - дельта одной записи: поля до и после,
+    # у изменения только отличающиеся, поэтому шаг занимает память по размеру правки, а не данных.
+    # Последние LIMIT шагов лежат в undo_log и переживают перезапуск.
+    LIMIT = 100
+
+    historyChanged = pyqtSignal()
+
+    def __init__(self, db, parent=None):
+        super().__init__(parent)
+        self.db = db
+        self.handlers = {}
+        self.done = []  # (seq, название, дельта)
+        self.undone = []  # стек повтора, сверху ближайший
+        for seq, undone, label, delta in db.load_undo_log():
+            (self.undone if undone else self.done).append((seq, label, json.loads(delta)))
+        self.undone.reverse()
+        # номера шагов выдаёт allocate_ids: у двух окон на одной базе они не совпадают
+        # и порядок в undo_log остаётся порядком действий
+        self.first_seq = max((step[0] for step in self.done + self.undone), default=0) + 1
+
+    def register(self, kind, handler):
+        # handler(id, поля) приводит запись к состоянию из дельты; поля None - записи нет
+        self.handlers[kind] = handler
+
+    def record(self, label, kind, record_id, before, after):
+        if before is not None and after is not None:
+            changed = [key for key in after if before.get(key) != after[key]]
+            if not changed:
+                return
+            before = {key: before.get(key) for key in changed}
+            after = {key: after[key] for key in changed}
+        try:
+            seq = self.db.allocate_ids("next_undo_seq", self.first_seq, 1)[0]
+        except sqlite3.OperationalError as e:
+            if not database_busy(e):
+                raise
+            # база занята другим окном: шаг работает в этом сеансе, но в undo_log не попадает
+            print(f"Шаг отмены не сохранён: {e}")
+            seq = None
+        step = (seq, label, {"kind": kind, "id": record_id, "before": before, "after": after})
+        self.done.append(step)
+        dropped = [old[0] for old in self.done[:-self.LIMIT] + self.undone if old[0] is not None]
+        del self.done[:-self.LIMIT]
+        self.undone.clear()
+        if dropped:
+            self.db.trim_undo_log(dropped)
+        self.save(step, False)
+        self.db.commit()
+        self.historyChanged.emit()
+
+    def save(self, step, undone):
+        seq, label, delta = step
+        if seq is None:
+            return
+        self.db.save_undo_step(seq, undone, label, json.dumps(delta, ensure_ascii=False))
+
+    def undo_label(self):
+        return self.done[-1][1] if self.done else None
+
+    def redo_label(self):
+        return self.undone[-1][1] if self.undone else None
+
+    def undo(self):
+        return self.step(self.done, self.undone, "before", True)
+
+    def redo(self):
+        return self.step(self.undone, self.done, "after", False)
+
+    def step(self, source, target, side, undone):
+        # возвращает вид записи, к которой применён шаг, или None, если шагать некуда
+        if not source:
+            return None
+        step = source.pop()
+        delta = step[2]
+        handler = self.handlers.get(delta["kind"])
+        if handler is not None:
+            handler(delta["id"], delta[side])
+        target.append(step)
+        self.save(step, undone)
+        self.db.commit()
+        self.historyChanged.emit()
+        return delta["kind"]
+
+
+HISTORY = None
+
+
+def get_history():
+    global HISTORY
+    if HISTORY is None:
+        HISTORY = UndoHistory(get_database())
+    return HISTORY
+
+
+class MarkedCalendar(QCalendarWidget):
+    # Поверх обычной ячейки рисуются отметки из DayIndex: точка - есть заметка, число - дедлайны.
+    # paintCell вызывается только для видимых дней, поэтому листание месяцев не зависит от объёма данных.
+    def __init__(self, day_index, parent=None):
+        super().__init__(parent)
+        self.day_index = day_index
+        day_index.dayChanged.connect(lambda day: self.updateCell(QDate.fromJulianDay(day)))
+        day_index.indexReset.connect(self.updateCells)
+
+    def paintCell(self, painter, rect, date):
+        super().paintCell(painter, rect, date)
+        has_note, deadlines = self.day_index.markers(date.toJulianDay())
+        if not has_note and not deadlines:
+            return
+        painter.save()
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        painter.setPen(Qt.PenStyle.NoPen)
+        if has_note:
+            painter.setBrush(QColor("#52CC7A"))
+            painter.drawEllipse(QRectF(rect.left() + 3, rect.bottom() - 8, 6, 6))
+        if deadlines:
+            size = min(14, rect.height() // 2)
+            badge = QRectF(rect.right() - size - 2, rect.top() + 2, size, size)
+            painter.setBrush(QColor("#FF6B6B"))
+            painter.drawEllipse(badge)
+            font = painter.font()
+            font.setPointSizeF(max(6.0, size * 0.5))
+            painter.setFont(font)
+            painter.setPen(QColor("#FFFFFF"))
+            painter.drawText(badge, Qt.AlignmentFlag.AlignCenter, str(deadlines) if deadlines < 10 else "9+")
+        painter.restore()
+
 
 class CalendarWidget(QWidget):
-    def __init__(self):
+    def __init__(self, db=None):
         super().__init__()
+        # в памяти только тексты показанных месяцев, какие дни вообще с заметками - знает DayIndex
         self.notes1 = {}
+        self.loaded_months = set()
+        self.unflushed = False
+        self.db = db or get_database()
+        self.day_index = get_day_index()
+        self.day_index.notesImported.connect(self.mark_stale)
+        self.db.watcher.calendarChanged.connect(self.apply_remote_notes)
+        self.db.watcher.resyncNeeded.connect(self.mark_stale)
+        self.stale = False
         self.initUI()
         self.load_notes_from_json()  # Load notes when the widget is initialized
 
     def initUI(self):
         layout = QVBoxLayout()
 
-        self.calendar = QCalendarWidget()
+        self.calendar = MarkedCalendar(self.day_index)
         self.calendar.selectionChanged.connect(self.show_notes_for_selected_date)
+        self.calendar.currentPageChanged.connect(lambda year, month: self.load_notes_from_json())
         layout.addWidget(self.calendar)
 
         self.notes_text = QTextEdit()
@@ -64,6 +1281,7 @@ class CalendarWidget(QWidget):
                """)
 
     def show_notes_for_selected_date(self):
+        self.load_notes_from_json()
         selected_date = self.calendar.selectedDate().toString("yyyy-MM-dd")
         note1 = self.notes1.get(selected_date, "")
         self.notes_text.setText(note1)
@@ -72,118 +1290,634 @@ class CalendarWidget(QWidget):
         selected_date = self.calendar.selectedDate().toString("yyyy-MM-dd")
         note1 = self.notes_text.toPlainText()
         self.notes1[selected_date] = note1
-        self.save_notes_to_json()  # Save notes to file after updating the notes dictionary
-        print(f"Заметка сохранена для {selected_date}: {note1}")
+        self.day_index.set_note(selected_date, bool(note1))
+        self.save_notes_to_json(selected_date)  # Save notes to file after updating the notes dictionary
 
-    def save_notes_to_json(self):
-        print("Сохраняем заметки в notes_2.json")  # Debug print statement
+    def save_notes_to_json(self, date=None):
+        # название осталось со времён notes_2.json, теперь заметки лежат в базе
         try:
-            with open('notes_2.json', 'w', encoding='utf-8') as file:
-                json.dump(self.notes1, file, ensure_ascii=False, indent=4)
-            print("Заметки успешно сохранены.")  # Debug print statement
-        except Exception as e:
+            dates = [date] if date is not None else list(self.notes1)
+            for day in dates:
+                self.db.save_calendar_note(day, self.notes1.get(day, ""))
+            self.db.commit()
+            self.unflushed = True
+        except sqlite3.Error as e:
             print(f"Ошибка при сохранении заметок: {e}")  # Debug print statement
 
     def load_notes_from_json(self):
-        print("Загружаем заметки из notes_2.json")  # Debug print statement
+        # подгружает месяц на экране и месяц выбранной даты, остальные выгружает
+        selected = self.calendar.selectedDate()
+        months = {(self.calendar.yearShown(), self.calendar.monthShown()), (selected.year(), selected.month())}
+        if months == self.loaded_months:
+            return
         try:
-            with open('notes_2.json', 'r', encoding='utf-8') as file:
-                self.notes1 = json.load(file)
-            print("Заметки успешно загружены.")  # Debug print statement
-        except FileNotFoundError:
-            self.notes1 = {}
-            print("Файл notes_2.json не найден. Создаем новый файл.")  # Debug print statement
-        except json.JSONDecodeError:
-            print("Ошибка при чтении файла JSON. Заметки не загружены.")
-            self.notes1 = {}
-        except Exception as e:
+            if self.unflushed:
+                self.db.flush()  # только что сохранённая заметка могла ещё не дойти до базы
+                self.unflushed = False
+            notes = {}
+            for year, month in months:
+                prefix = f"{year:04d}-{month:02d}-"
+                if (year, month) in self.loaded_months:
+                    notes.update((date, text) for date, text in self.notes1.items() if date.startswith(prefix))
+                else:
+                    notes.update(self.db.load_calendar_month(year, month))
+            self.notes1 = notes
+            self.loaded_months = months
+        except sqlite3.Error as e:
             print(f"Ошибка при загрузке заметок: {e}")  # Debug print statement
-            self.notes1 = {}
 
+    def mark_stale(self):
+        # заметки могли прийти импортом, перечитываем месяцы при следующем показе
+        self.stale = True
+        if self.isVisible():
+            self.reload_notes()
+
+    def reload_notes(self):
+        self.stale = False
+        self.unflushed = True
+        self.loaded_months = set()
+        self.load_notes_from_json()
+        self.show_notes_for_selected_date()
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        if self.stale:
+            self.reload_notes()
+
+    def apply_remote_notes(self, dates):
+        # заметки дней, изменённые другой копией органайзера; невыгруженные месяцы не трогаем
+        selected = self.calendar.selectedDate().toString("yyyy-MM-dd")
+        shown = self.notes1.get(selected, "")
+        texts = self.db.load_calendar_notes(dates)
+        for date in dates:
+            if (int(date[:4]), int(date[5:7])) in self.loaded_months:
+                self.notes1[date] = texts.get(date, "")
+        if selected in dates:
+            if self.notes_text.toPlainText() == shown:  # несохранённый ввод пользователя не затирается
+                self.notes_text.setText(self.notes1.get(selected, ""))
+
+    def select_date(self, date):
+        self.calendar.setSelectedDate(QDate.fromString(date, "yyyy-MM-dd"))
+
+
+DEADLINE_FORMAT = '%d.%m.%Y %H:%M'
+COLUMN_TITLES = {"tasks": "Задачи", "in_progress": "В процессе"}
+COLUMN_BY_TITLE = {title: column for column, title in COLUMN_TITLES.items()}
+DEFAULT_EFFORT = 4  # оценка трудоёмкости задачи в помидорах, если её не указали
+
+
+class Recurrence:
+    # Правило повтора: каждые days дней, всего count раз считая текущий срок, не позже until.
+    # Серия хранится одной задачей со сроком ближайшего экземпляра, остальные сроки вычисляются
+    # по требованию. В базе и в .ics правило записано подмножеством RRULE.
+    __slots__ = ("days", "count", "until")
+    PARTS = {"FREQ", "INTERVAL", "COUNT", "UNTIL"}
+
+    def __init__(self, days, count=None, until=None):
+        self.days = days
+        self.count = count
+        self.until = until
+
+    def __eq__(self, other):
+        return (isinstance(other, Recurrence)
+                and (self.days, self.count, self.until) == (other.days, other.count, other.until))
 
+    @staticmethod
+    def parse(text):
+        # 'FREQ=WEEKLY;INTERVAL=2;COUNT=10' -> Recurrence. Правило с любой другой частью (BYDAY, BYMONTHDAY...)
+        # дало бы другие сроки, поэтому оно не упрощается, а даёт None: задача импортируется разовой
+        if not text:
+            return None
+        try:
+            parts = dict(part.partition("=")[::2] for part in text.upper().split(";"))
+            if not parts.keys() <= Recurrence.PARTS:
+                return None
+            step = {"DAILY": 1, "WEEKLY": 7}[parts["FREQ"]]
+            interval = int(parts.get("INTERVAL", 1))
+            count = int(parts["COUNT"]) if "COUNT" in parts else None
+            until = ics_datetime(parts["UNTIL"], {})[0] if "UNTIL" in parts else None
+            # нечитаемый UNTIL превратил бы конечную серию в бесконечную
+            if interval < 1 or (count is not None and count < 1) or ("UNTIL" in parts and until is None):
+                return None
+            return Recurrence(step * interval, count, until)
+        except (KeyError, ValueError):
+            return None
+
+    def rule(self):
+        if self.days % 7 == 0:
+            text = "FREQ=WEEKLY;INTERVAL=%d" % (self.days // 7)
+        else:
+            text = "FREQ=DAILY;INTERVAL=%d" % self.days
+        if self.count is not None:
+            text += ";COUNT=%d" % self.count
+        if self.until is not None:
+            text += self.until.strftime(";UNTIL=%Y%m%dT%H%M%S")
+        return text
+
+    def next(self, deadline):
+        # (следующий срок, правило для него) или None, если серия закончилась
+        following = deadline + timedelta(days=self.days)
+        if (self.count is not None and self.count <= 1) or (self.until is not None and following > self.until):
+            return None
+        return following, Recurrence(self.days, None if self.count is None else self.count - 1, self.until)
+
+    def last(self, deadline):
+        # последний срок серии, None - бесконечная серия
+        steps = None if self.count is None else self.count - 1
+        if self.until is not None:
+            until_steps = max(0, (self.until - deadline) // timedelta(days=self.days))
+            steps = until_steps if steps is None else min(steps, until_steps)
+        return None if steps is None else deadline + timedelta(days=self.days * steps)
+
+    def occurrences(self, deadline, start, end):
+        # сроки серии в [start, end); начало окна находится делением, а не перебором
+        step = timedelta(days=self.days)
+        index = max(0, -((deadline - start) // step))
+        last = self.last(deadline)
+        moment = deadline + step * index
+        while moment < end and (last is None or moment <= last):
+            yield moment
+            moment += step
+
+    def describe(self):
+        if self.days == 1:
+            text = "каждый день"
+        elif self.days == 7:
+            text = "каждую неделю"
+        elif self.days % 7 == 0:
+            text = f"каждые {self.days // 7} нед."
+        else:
+            text = f"каждые {self.days} дн."
+        if self.count is not None:
+            text += f", осталось: {self.count}"
+        if self.until is not None:
+            text += f", до {self.until:%d.%m.%Y}"
+        return text
 
-class TaskCard(QWidget):                                     #создание виджита
-    def __init__(self, title, deadline, task_name, subject):
-        super().__init__()
-        self.initUI(title, deadline, task_name, subject)
-
-    def initUI(self, title, deadline, task_name, subject): #создание интерфейса
-        layout = QVBoxLayout()
-
-        self.titleLabel = QLabel(title)
-        self.deadlineLabel = QLabel(deadline)
-        self.taskNameLabel = QPushButton(task_name)
-        self.taskNameLabel.setStyleSheet("background-color: #E4E4E2; border: none;")
-        self.subjectLabel = QPushButton(subject)
-        self.subjectLabel.setStyleSheet("background-color: #E4E4E2; border: none;")
-
-        menuButton = QPushButton("...")
-        menuButton.setFixedSize(30, 30)
-        menuButton.clicked.connect(self.showMenu)
 
-        layout.addWidget(self.titleLabel)
-        layout.addWidget(self.deadlineLabel)
-        layout.addWidget(self.taskNameLabel)
-        layout.addWidget(self.subjectLabel)
-        layout.addWidget(menuButton)
+class Task:
+    __slots__ = ("id", "title", "deadline", "task_name", "subject", "column", "effort", "recurrence")
 
-        self.setLayout(layout)
-        self.setStyleSheet("background-color: #F9F9F9; border-radius: 10px; padding: 10px;")
+    def __init__(self, task_id, title, deadline, task_name, subject, column="tasks", effort=DEFAULT_EFFORT,
+                 recurrence=None):
+        self.id = task_id
+        self.title = title
+        self.deadline = deadline  # datetime, либо исходная строка, если её не удалось разобрать
+        self.task_name = task_name
+        self.subject = subject
+        self.column = column
+        self.effort = effort  # сколько помидоров нужно на задачу
+        self.recurrence = recurrence  # Recurrence для повторяющейся задачи
 
-    def showMenu(self):
-        menu = QMenu(self)
-        editAction = QAction('Редактировать', self)
-        deleteAction = QAction('Удалить', self)
-        archiveAction = QAction('Добавить в архив', self)
+    @staticmethod
+    def parse_deadline(text):
+        try:
+            # быстрый разбор 'дд.мм.гггг чч:мм', strptime на десятках тысяч задач заметно медленнее
+            if len(text) == 16 and text[2] == text[5] == '.' and text[10] == ' ' and text[13] == ':':
+                return datetime(int(text[6:10]), int(text[3:5]), int(text[:2]), int(text[11:13]), int(text[14:]))
+            return datetime.strptime(text, DEADLINE_FORMAT)
+        except (TypeError, ValueError):
+            return text
+
+    def deadline_text(self):
+        if isinstance(self.deadline, datetime):
+            return self.deadline.strftime(DEADLINE_FORMAT)
+        return self.deadline
 
-        menu.addAction(editAction)
-        menu.addAction(deleteAction)
-        menu.addAction(archiveAction)
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "title": self.title,
+            "deadline": self.deadline_text(),
+            "task_name": self.task_name,
+            "subject": self.subject,
+            "effort": self.effort,
+            "recurrence": self.recurrence.rule() if self.recurrence is not None else None
+        }
 
-        editAction.triggered.connect(self.editTask)
-        deleteAction.triggered.connect(self.deleteTask)
-        archiveAction.triggered.connect(self.archiveTask)
+    @staticmethod
+    def from_dict(task_id, data, column):
+        return Task(
+            task_id,
+            data["title"],
+            data["deadline"] if isinstance(data["deadline"], datetime) else Task.parse_deadline(data["deadline"]),
+            data["task_name"],
+            data["subject"],
+            column,
+            data.get("effort", DEFAULT_EFFORT),
+            Recurrence.parse(data.get("recurrence"))
+        )
 
-        menu.exec(self.mapToGlobal(self.sender().pos()))
 
-    def editTask(self):
-        dialog = AddTaskDialog()
-        dialog.titleEdit.setText(self.titleLabel.text())
-        dialog.deadlineEdit.setDateTime(datetime.strptime(self.deadlineLabel.text(), '%d.%m.%Y %H:%M'))
-        dialog.taskNameEdit.setText(self.taskNameLabel.text())
-        dialog.subjectEdit.setText(self.subjectLabel.text())
-        current_category = "Задачи" if self.parentWidget() == window.tasksLayout else "В процессе"
-        dialog.categoryComboBox.setCurrentText(current_category)
+class TaskStore(QObject):
+    # Единственная копия состояния задач. Виджеты только подписываются на сигналы,
+    # поэтому сохранение, проверка дедлайнов и фильтры работают без обхода layout'ов.
+    taskAdded = pyqtSignal(int)
+    taskUpdated = pyqtSignal(int, str)  # id, прежняя колонка
+    taskRemoved = pyqtSignal(int, str)
+    tasksReset = pyqtSignal()
 
-        if dialog.exec():
-            title, deadline, task_name, subject, category = dialog.getTaskData()
-            self.titleLabel.setText(title)
-            self.deadlineLabel.setText(deadline)
-            self.taskNameLabel.setText(task_name)
-            self.subjectLabel.setText(subject)
-
-            if category != current_category:
-                self.setParent(None)  # Remove from the current layout
-                if category == "В процессе":
-                    window.tasksLayout.addWidget(self)
-                else:
-                    window.inProgressLayout.addWidget(self)
-
-            for widget in QApplication.topLevelWidgets():
-                if isinstance(widget, MainWindow):
-                    widget.saveTasks()
-                    break
-
-    def deleteTask(self):
-        self.setParent(None)
-        window.saveTasks()
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.tasks = {}
+        # id -> позиция в колонке: растёт при добавлении и переносе из другой колонки, как position в базе
+        self.columns = {column: {} for column in COLUMN_TITLES}
+        self.positions = itertools.count()
+        self.next_id = 1
+        self.id_limit = 0
+        self.allocate_ids = None  # (минимум, сколько) -> (начало, конец) блока id, общего с другими процессами
+        self.index = TaskIndex(self)  # подписывается первым, модели доски читают уже обновлённый индекс
+
+    def __len__(self):
+        return len(self.tasks)
+
+    def get(self, task_id):
+        return self.tasks.get(task_id)
+
+    def column(self, column):
+        tasks = self.tasks
+        return [tasks[task_id] for task_id in self.columns[column]]
+
+    def count(self, column):
+        return len(self.columns[column])
+
+    def add(self, title, deadline, task_name, subject, column="tasks", task_id=None, effort=DEFAULT_EFFORT,
+            recurrence=None):
+        if task_id is None or task_id in self.tasks:
+            task_id = self.reserve_id()
+        self.next_id = max(self.next_id, task_id + 1)
+        if not isinstance(deadline, datetime):
+            deadline = Task.parse_deadline(deadline)
+        task = Task(task_id, title, deadline, task_name, subject, column, effort, recurrence)
+        self.tasks[task_id] = task
+        self.columns[column][task_id] = next(self.positions)
+        self.taskAdded.emit(task_id)
+        return task
+
+    def update(self, task_id, **fields):
+        task = self.tasks[task_id]
+        old_column = task.column
+        if "deadline" in fields and not isinstance(fields["deadline"], datetime):
+            fields["deadline"] = Task.parse_deadline(fields["deadline"])
+        for name, value in fields.items():
+            setattr(task, name, value)
+        if task.column != old_column:
+            del self.columns[old_column][task_id]
+            self.columns[task.column][task_id] = next(self.positions)
+        self.taskUpdated.emit(task_id, old_column)
+        return task
+
+    def move(self, task_id, column):
+        return self.update(task_id, column=column)
+
+    def remove(self, task_id):
+        task = self.tasks.pop(task_id)
+        del self.columns[task.column][task_id]
+        self.taskRemoved.emit(task_id, task.column)
+        return task
+
+    def ensure_ids(self, count):
+        # следующие count id должны принадлежать этому процессу
+        if self.allocate_ids is not None and self.next_id + count > self.id_limit:
+            self.next_id, self.id_limit = self.allocate_ids(self.next_id, max(count, OrganizerDatabase.ID_BLOCK))
+
+    def reserve_id(self):
+        # новый id; также для записи вне доски, например прошедшего экземпляра повторяющейся задачи
+        self.ensure_ids(1)
+        task_id = self.next_id
+        self.next_id += 1
+        return task_id
+
+    def filter(self, predicate, columns=("tasks", "in_progress")):
+        tasks = self.tasks
+        return [tasks[task_id] for column in columns for task_id in self.columns[column]
+                if predicate(tasks[task_id])]
+
+    def add_many(self, records):
+        # массовое добавление: один tasksReset вместо сигнала на каждую задачу
+        records = list(records)
+        self.ensure_ids(len(records))
+        tasks = []
+        for title, deadline, task_name, subject, column, effort, recurrence in records:
+            if not isinstance(deadline, datetime):
+                deadline = Task.parse_deadline(deadline)
+            task = Task(self.next_id, title, deadline, task_name, subject, column, effort, recurrence)
+            self.next_id += 1
+            self.tasks[task.id] = task
+            self.columns[column][task.id] = next(self.positions)
+            tasks.append(task)
+        if tasks:
+            self.tasksReset.emit()
+        return tasks
+
+    def load_dict(self, data):
+        self.tasks.clear()
+        for ids in self.columns.values():
+            ids.clear()
+        entries = [(column, task_data) for column in COLUMN_TITLES for task_data in data.get(column, [])]
+        used_ids = [task_data.get("id") for column, task_data in entries if isinstance(task_data.get("id"), int)]
+        self.next_id = max(max(used_ids, default=0) + 1, data.get("next_id", 1))
+        self.id_limit = 0
+        for column, task_data in entries:
+            task_id = task_data.get("id")
+            if not isinstance(task_id, int) or task_id in self.tasks:
+                task_id = self.next_id
+                self.next_id += 1
+            self.tasks[task_id] = Task.from_dict(task_id, task_data, column)
+            self.columns[column][task_id] = next(self.positions)
+        self.tasksReset.emit()
 
-    def archiveTask(self):
-        window.archiveWindow.addArchivedTask(self)
-        window.saveTasks()
+    def to_dict(self):
+        data = {column: [task.to_dict() for task in self.column(column)] for column in COLUMN_TITLES}
+        data["next_id"] = self.next_id  # id архивных задач не должны выдаваться повторно
+        return data
+
+
+class TaskIndex(QObject):
+    # Вторичные индексы доски: задачи каждой колонки и каждой пары (колонка, предмет) в списках,
+    # отсортированных по (дедлайн, id). Поддерживаются на каждом сигнале TaskStore, поэтому фильтр
+    # по колонке, предмету и сроку берёт срез бисекцией и не обходит все задачи.
+    NO_DEADLINE = datetime.max  # задачи с неразобранным сроком стоят в конце
+
+    subjectsChanged = pyqtSignal()
+
+    def __init__(self, store):
+        super().__init__(store)
+        self.store = store
+        self.columns = {}  # колонка -> отсортированный список ключей
+        self.groups = {}  # (колонка, предмет) -> отсортированный список ключей
+        self.subjects = {}  # предмет -> число задач
+        self.entries = {}  # id -> (ключ, предмет, колонка)
+        store.taskAdded.connect(self.onTaskChanged)
+        store.taskUpdated.connect(self.onTaskChanged)
+        store.taskRemoved.connect(self.onTaskRemoved)
+        store.tasksReset.connect(self.onTasksReset)
+
+    @classmethod
+    def key(cls, task):
+        return (task.deadline if isinstance(task.deadline, datetime) else cls.NO_DEADLINE, task.id)
+
+    def onTaskChanged(self, task_id, old_column=None):
+        task = self.store.get(task_id)
+        entry = (self.key(task), task.subject, task.column)
+        if self.entries.get(task_id) == entry:
+            return
+        self.removeEntry(task_id)
+        self.entries[task_id] = entry
+        key, subject, column = entry
+        for keys in (self.columns.setdefault(column, []), self.groups.setdefault((column, subject), [])):
+            keys.insert(bisect_left(keys, key), key)
+        self.subjects[subject] = self.subjects.get(subject, 0) + 1
+        if self.subjects[subject] == 1:
+            self.subjectsChanged.emit()
+
+    def onTaskRemoved(self, task_id, column=None):
+        self.removeEntry(task_id)
+
+    def removeEntry(self, task_id):
+        entry = self.entries.pop(task_id, None)
+        if entry is None:
+            return
+        key, subject, column = entry
+        keys = self.columns[column]
+        del keys[bisect_left(keys, key)]
+        keys = self.groups[(column, subject)]
+        del keys[bisect_left(keys, key)]
+        if not keys:
+            del self.groups[(column, subject)]
+        self.subjects[subject] -= 1
+        if not self.subjects[subject]:
+            del self.subjects[subject]
+            self.subjectsChanged.emit()
+
+    def onTasksReset(self):
+        self.entries = {task.id: (self.key(task), task.subject, task.column) for task in self.store.tasks.values()}
+        self.columns = {}
+        self.groups = {}
+        self.subjects = {}
+        for key, subject, column in sorted(self.entries.values()):
+            self.columns.setdefault(column, []).append(key)
+            self.groups.setdefault((column, subject), []).append(key)
+            self.subjects[subject] = self.subjects.get(subject, 0) + 1
+        self.subjectsChanged.emit()
+
+    def subject_names(self):
+        return sorted(subject for subject in self.subjects if subject)
+
+    def matches(self, task, subject=None, start=None, end=None):
+        deadline = self.key(task)[0]
+        return ((subject is None or task.subject == subject) and (start is None or deadline >= start)
+                and (end is None or deadline < end))
+
+    def query(self, column, subject=None, start=None, end=None):
+        # ключи (дедлайн, id) задач колонки со сроком в [start, end), по возрастанию: O(log n + k)
+        keys = self.columns.get(column, []) if subject is None else self.groups.get((column, subject), [])
+        low = 0 if start is None else bisect_left(keys, (start,))
+        high = len(keys) if end is None else bisect_left(keys, (end,))
+        return keys[low:high]
+
+
+class TaskListModel(QAbstractListModel):
+    # Модель одной колонки доски. Хранит только id задач, сами данные берутся из TaskStore.
+    # Фильтр и порядок меняются сбросом модели по срезу TaskIndex, виджеты не пересоздаются.
+    TaskRole = Qt.ItemDataRole.UserRole
+    SORT_ADDED = "added"
+    SORT_DEADLINE = "deadline"
+
+    def __init__(self, store, column, parent=None):
+        super().__init__(parent)
+        self.store = store
+        self.column = column
+        self.subject = None
+        self.start = None
+        self.end = None
+        self.sort = self.SORT_ADDED
+        self.ids = []
+        self.keys = []  # ключи сортировки строк, параллельно ids
+        self.rows = {}  # id -> ключ сортировки
+        self.refill()
+        store.taskAdded.connect(self.onTaskAdded)
+        store.taskUpdated.connect(self.onTaskUpdated)
+        store.taskRemoved.connect(self.onTaskRemoved)
+        store.tasksReset.connect(self.onTasksReset)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.ids)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        task = self.store.get(self.ids[index.row()])
+        if role == Qt.ItemDataRole.DisplayRole:
+            return task.title
+        if role == Qt.ItemDataRole.ToolTipRole:
+            return f"{task.task_name}\n{task.subject}"
+        if role == self.TaskRole:
+            return task
+        return None
+
+    def isFiltered(self):
+        return self.subject is not None or self.start is not None or self.end is not None
+
+    def setFilter(self, subject=None, start=None, end=None, sort=SORT_ADDED):
+        self.beginResetModel()
+        self.subject = subject
+        self.start = start
+        self.end = end
+        self.sort = sort
+        self.refill()
+        self.endResetModel()
+
+    def sortKey(self, task):
+        # «по добавлению» - позиция в колонке из TaskStore: перенесённая задача встаёт в конец
+        return TaskIndex.key(task) if self.sort == self.SORT_DEADLINE else self.store.columns[self.column][task.id]
+
+    def refill(self):
+        if self.sort == self.SORT_DEADLINE:
+            self.keys = self.store.index.query(self.column, self.subject, self.start, self.end)
+            self.ids = [task_id for _, task_id in self.keys]
+        else:
+            positions = self.store.columns[self.column]
+            if self.isFiltered():
+                rows = sorted((positions[task_id], task_id)
+                              for _, task_id in self.store.index.query(self.column, self.subject, self.start, self.end))
+                self.keys = [position for position, _ in rows]
+                self.ids = [task_id for _, task_id in rows]
+            else:
+                self.ids = list(positions)  # dict хранит порядок вставки, он же порядок позиций
+                self.keys = list(positions.values())
+        self.rows = dict(zip(self.ids, self.keys))
+
+    def accepts(self, task):
+        return task.column == self.column and self.store.index.matches(task, self.subject, self.start, self.end)
+
+    def rowOf(self, task_id):
+        key = self.rows.get(task_id)
+        return None if key is None else bisect_left(self.keys, key)
+
+    def insertTask(self, task):
+        key = self.sortKey(task)
+        row = bisect_left(self.keys, key)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.ids.insert(row, task.id)
+        self.keys.insert(row, key)
+        self.rows[task.id] = key
+        self.endInsertRows()
+
+    def removeId(self, task_id):
+        row = self.rowOf(task_id)
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self.ids[row]
+        del self.keys[row]
+        del self.rows[task_id]
+        self.endRemoveRows()
+
+    def onTaskAdded(self, task_id):
+        task = self.store.get(task_id)
+        if self.accepts(task):
+            self.insertTask(task)
+
+    def onTaskUpdated(self, task_id, old_column):
+        task = self.store.get(task_id)
+        accepted = self.accepts(task)
+        if accepted and self.rows.get(task_id) == self.sortKey(task):
+            index = self.index(self.rowOf(task_id))
+            self.dataChanged.emit(index, index)
+            return
+        if task_id in self.rows:
+            self.removeId(task_id)
+        if accepted:
+            self.insertTask(task)
+
+    def onTaskRemoved(self, task_id, column):
+        if task_id in self.rows:
+            self.removeId(task_id)
+
+    def onTasksReset(self):
+        self.beginResetModel()
+        self.refill()
+        self.endResetModel()
+
+
+class TaskCardDelegate(QStyledItemDelegate):
+    # Рисует карточку задачи вместо отдельного QWidget: в памяти нет виджетов на каждую задачу,
+    # а отрисовываются только строки, попавшие в видимую область QListView.
+    menuRequested = pyqtSignal(int, QPoint)
+
+    MARGIN = 6
+    PADDING = 10
+    MENU_SIZE = 30
+
+    def lineHeight(self, option):
+        return option.fontMetrics.height() + 10
+
+    def sizeHint(self, option, index):
+        height = 4 * self.lineHeight(option) + self.MENU_SIZE + 2 * (self.MARGIN + self.PADDING)
+        return QSize(300, height)
+
+    def cardRect(self, rect):
+        return rect.adjusted(self.MARGIN, self.MARGIN // 2, -self.MARGIN, -self.MARGIN // 2)
+
+    def menuRect(self, rect):
+        card = self.cardRect(rect)
+        return QRect(card.left() + self.PADDING, card.bottom() - self.PADDING - self.MENU_SIZE,
+                     self.MENU_SIZE, self.MENU_SIZE)
+
+    def paint(self, painter, option, index):
+        task = index.data(TaskListModel.TaskRole)
+        if task is None:
+            return
+        painter.save()
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+
+        card = self.cardRect(option.rect)
+        painter.setPen(QColor("#82D19C") if option.state & QStyle.StateFlag.State_Selected else Qt.PenStyle.NoPen)
+        painter.setBrush(QColor("#F9F9F9"))
+        painter.drawRoundedRect(QRectF(card), 10, 10)
+
+        fm = option.fontMetrics
+        line = self.lineHeight(option)
+        row = QRect(card.left() + self.PADDING, card.top() + self.PADDING, card.width() - 2 * self.PADDING, line)
+        align = Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter
+        painter.setPen(QColor("#000000"))
+        painter.drawText(row, align, fm.elidedText(task.title, Qt.TextElideMode.ElideRight, row.width()))
+        row.translate(0, line)
+        deadline = task.deadline_text()
+        if task.recurrence is not None:
+            deadline += " ⟳ " + task.recurrence.describe()
+        painter.drawText(row, align, fm.elidedText(deadline, Qt.TextElideMode.ElideRight, row.width()))
+
+        for text in (task.task_name, task.subject):
+            row.translate(0, line)
+            pill = row.adjusted(0, 2, 0, -2)
+            painter.setPen(Qt.PenStyle.NoPen)
+            painter.setBrush(QColor("#E4E4E2"))
+            painter.drawRect(pill)
+            painter.setPen(QColor("#000000"))
+            painter.drawText(pill, Qt.AlignmentFlag.AlignCenter,
+                             fm.elidedText(text, Qt.TextElideMode.ElideRight, pill.width() - 8))
+
+        menu = self.menuRect(option.rect)
+        painter.setPen(QColor("#C8C8C8"))
+        painter.setBrush(QColor("#FFFFFF"))
+        painter.drawRoundedRect(QRectF(menu), 4, 4)
+        painter.setPen(QColor("#000000"))
+        painter.drawText(menu, Qt.AlignmentFlag.AlignCenter, "...")
+        painter.restore()
+
+    def editorEvent(self, event, model, option, index):
+        if (event.type() == QEvent.Type.MouseButtonRelease
+                and event.button() == Qt.MouseButton.LeftButton
+                and self.menuRect(option.rect).contains(event.position().toPoint())):
+            task = index.data(TaskListModel.TaskRole)
+            self.menuRequested.emit(task.id, event.globalPosition().toPoint())
+            return True
+        return super().editorEvent(event, model, option, index)
 
 
 class AddTaskDialog(QDialog):
+    REPEATS = [("Не повторять", None), ("Каждый день", 1), ("Каждую неделю", 7), ("Каждые N дней", 0)]
+
     def __init__(self):
         super().__init__()
         self.initUI()
@@ -201,12 +1935,35 @@ class AddTaskDialog(QDialog):
         self.subjectEdit = QLineEdit()
         self.categoryComboBox = QComboBox()
         self.categoryComboBox.addItems(["Задачи", "В процессе"])
+        self.effortEdit = QSpinBox()
+        self.effortEdit.setRange(1, 200)
+        self.effortEdit.setValue(DEFAULT_EFFORT)
+        self.repeatComboBox = QComboBox()
+        for title, days in self.REPEATS:
+            self.repeatComboBox.addItem(title, days)
+        self.intervalEdit = QSpinBox()
+        self.intervalEdit.setRange(1, 365)
+        self.intervalEdit.setSuffix(" дн.")
+        self.countEdit = QSpinBox()
+        self.countEdit.setRange(0, 1000)
+        self.countEdit.setSpecialValueText("без ограничения")
+        self.untilEdit = QDateEdit(calendarPopup=True)
+        self.untilEdit.setMinimumDate(QDate(2000, 1, 1))
+        self.untilEdit.setSpecialValueText("без даты окончания")
+        self.untilEdit.setDate(self.untilEdit.minimumDate())
+        self.repeatComboBox.currentIndexChanged.connect(self.updateRepeatFields)
+        self.updateRepeatFields()
 
         layout.addRow('Название:', self.titleEdit)
         layout.addRow('Дедлайн:', self.deadlineEdit)
         layout.addRow('Название работы:', self.taskNameEdit)
         layout.addRow('Предмет:', self.subjectEdit)
+        layout.addRow('Оценка (помидоров):', self.effortEdit)
         layout.addRow('Категория:', self.categoryComboBox)
+        layout.addRow('Повтор:', self.repeatComboBox)
+        layout.addRow('Интервал:', self.intervalEdit)
+        layout.addRow('Сколько раз:', self.countEdit)
+        layout.addRow('До даты:', self.untilEdit)
 
         buttons = QDialogButtonBox(QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel)
         buttons.accepted.connect(self.validate)
@@ -227,14 +1984,103 @@ class AddTaskDialog(QDialog):
             self.deadlineEdit.dateTime().toString('dd.MM.yyyy HH:mm'),
             self.taskNameEdit.text(),
             self.subjectEdit.text(),
-            self.categoryComboBox.currentText()
+            self.categoryComboBox.currentText(),
+            self.effortEdit.value()
         )
 
+    def updateRepeatFields(self):
+        days = self.repeatComboBox.currentData()
+        self.intervalEdit.setEnabled(days == 0)
+        self.countEdit.setEnabled(days is not None)
+        self.untilEdit.setEnabled(days is not None)
+
+    def setRecurrence(self, recurrence):
+        if recurrence is None:
+            return
+        position = self.repeatComboBox.findData(recurrence.days)
+        self.repeatComboBox.setCurrentIndex(position if position >= 0 else self.repeatComboBox.findData(0))
+        self.intervalEdit.setValue(recurrence.days)
+        self.countEdit.setValue(recurrence.count or 0)
+        if recurrence.until is not None:
+            self.untilEdit.setDate(recurrence.until.date())
+
+    def getRecurrence(self):
+        days = self.repeatComboBox.currentData()
+        if days is None:
+            return None
+        until = None
+        if self.untilEdit.date() != self.untilEdit.minimumDate():
+            until = datetime.combine(self.untilEdit.date().toPyDate(), datetime.max.time().replace(microsecond=0))
+        return Recurrence(days or self.intervalEdit.value(), self.countEdit.value() or None, until)
+
+
+class ArchiveListModel(QAbstractListModel):
+    # Задачи архива подгружаются страницами через canFetchMore/fetchMore по мере прокрутки.
+    # Страница выбирается по seq > последнего загруженного, без OFFSET, поэтому глубокая прокрутка не дорожает.
+    PAGE_SIZE = 100
+
+    def __init__(self, db, parent=None):
+        super().__init__(parent)
+        self.db = db
+        self.tasks = []
+        self.last_seq = 0
+        self.has_more = True
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.tasks)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        task = self.tasks[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return task.title
+        if role == Qt.ItemDataRole.ToolTipRole:
+            return f"{task.task_name}\n{task.subject}"
+        if role == TaskListModel.TaskRole:
+            return task
+        return None
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self.has_more
+
+    def fetchMore(self, parent=QModelIndex()):
+        rows = self.db.archive_page(self.last_seq, self.PAGE_SIZE)
+        self.has_more = len(rows) == self.PAGE_SIZE
+        if not rows:
+            return
+        self.last_seq = rows[-1][0]
+        row = len(self.tasks)
+        self.beginInsertRows(QModelIndex(), row, row + len(rows) - 1)
+        self.tasks.extend(task for seq, task in rows)
+        self.endInsertRows()
+
+    def removeTask(self, task_id):
+        for row, task in enumerate(self.tasks):
+            if task.id == task_id:
+                self.beginRemoveRows(QModelIndex(), row, row)
+                del self.tasks[row]
+                self.endRemoveRows()
+                return task
+        return None
+
+    def reload(self):
+        self.beginResetModel()
+        self.tasks = []
+        self.last_seq = 0
+        self.has_more = True
+        self.endResetModel()
+
 
 class ArchiveWindow(QMainWindow):
-    def __init__(self):
+    def __init__(self, db):
         super().__init__()
+        self.db = db
+        self.model = None
+        self.archived = False
         self.initUI()
+        db.committed.connect(self.onCommitted)
+        db.watcher.archiveChanged.connect(self.onRemoteChanged)
 
     def initUI(self):
         self.setWindowTitle('Архив')
@@ -244,34 +2090,461 @@ class ArchiveWindow(QMainWindow):
         mainLayout = QVBoxLayout()
 
         tasksColumn = QVBoxLayout()
-        tasksTitle = QLabel("Архив")
-        tasksScroll = QScrollArea()
-        tasksWidget = QWidget()
-        self.tasksLayout = QVBoxLayout()
-
-        tasksWidget.setLayout(self.tasksLayout)
-        tasksScroll.setWidget(tasksWidget)
-        tasksScroll.setWidgetResizable(True)
-
-        tasksColumn.addWidget(tasksTitle)
-        tasksColumn.addWidget(tasksScroll)
+        self.tasksTitle = QLabel()
+        self.tasksView = QListView()
+        self.delegate = TaskCardDelegate(self)
+        self.delegate.menuRequested.connect(self.showTaskMenu)
+        self.tasksView.setItemDelegate(self.delegate)
+        self.tasksView.setUniformItemSizes(True)
+        self.tasksView.setVerticalScrollMode(QListView.ScrollMode.ScrollPerPixel)
+        self.tasksView.setEditTriggers(QListView.EditTrigger.NoEditTriggers)
+        self.updateHeader()
+
+        tasksColumn.addWidget(self.tasksTitle)
+        tasksColumn.addWidget(self.tasksView)
 
         mainLayout.addLayout(tasksColumn)
 
         mainWidget.setLayout(mainLayout)
         self.setCentralWidget(mainWidget)
 
-    def addArchivedTask(self, task):
-        self.tasksLayout.addWidget(task)
+    def updateHeader(self):
+        count, subjects = self.db.archive_summary()
+        text = f"Архив: {count}"
+        if subjects:
+            text += " (" + ", ".join(f"{subject or '—'}: {n}" for subject, n in subjects[:5]) + ")"
+        self.tasksTitle.setText(text)
+
+    def showEvent(self, event):
+        if self.model is None:  # архив читается только при первом открытии окна
+            self.model = ArchiveListModel(self.db, self)
+            self.tasksView.setModel(self.model)
+        super().showEvent(event)
+
+    def tasksArchived(self):
+        # запись в архив выполняется в фоне, новые строки подгружаются после её фиксации
+        self.archived = True
+
+    def onCommitted(self):
+        self.updateHeader()
+        if self.archived and self.model is not None:
+            self.model.has_more = True
+            self.model.fetchMore()
+        self.archived = False
+
+    def onRemoteChanged(self):
+        # другая копия органайзера архивировала или удалила задачи; страницы перечитаются по мере прокрутки
+        self.updateHeader()
+        if self.model is not None:
+            self.model.reload()
+
+    def showTaskMenu(self, task_id, pos):
+        menu = QMenu(self)
+        deleteAction = QAction('Удалить', self)
+        menu.addAction(deleteAction)
+        deleteAction.triggered.connect(lambda: self.deleteTask(task_id))
+        menu.exec(pos)
+
+    def deleteTask(self, task_id):
+        task = self.model.removeTask(task_id)
+        if task:
+            self.db.delete_archived_task(task.id)
+            self.db.commit()
+
+
+class DeadlineScheduler(QObject):
+    # Дедлайны хранятся в min-heap, таймер взводится только на ближайший из них.
+    # Удалённые и перепланированные записи не ищутся в куче, а отбрасываются лениво.
+    MAX_INTERVAL = 60 * 60 * 1000  # перепроверка раз в час на случай перевода системных часов
+
+    due = pyqtSignal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.heap = []
+        self.entries = {}
+        self.counter = itertools.count()
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.due.emit)
+
+    def schedule(self, key, deadline):
+        seq = next(self.counter)
+        self.entries[key] = (deadline, seq)
+        heapq.heappush(self.heap, (deadline, seq, key))
+        self.compact()
+        self.rearm()
+
+    def unschedule(self, key):
+        if self.entries.pop(key, None) is not None:
+            self.compact()
+            self.rearm()
+
+    def clear(self):
+        self.heap.clear()
+        self.entries.clear()
+        self.timer.stop()
+
+    def reset(self, items):
+        self.entries = {key: (deadline, next(self.counter)) for key, deadline in items}
+        self.heap = [(deadline, seq, key) for key, (deadline, seq) in self.entries.items()]
+        heapq.heapify(self.heap)
+        self.rearm()
+
+    def popDue(self, now):
+        expired = []
+        while self.heap and self.heap[0][0] <= now:
+            deadline, seq, key = heapq.heappop(self.heap)
+            if self.entries.get(key) == (deadline, seq):
+                del self.entries[key]
+                expired.append(key)
+        return expired
+
+    def compact(self):
+        if len(self.heap) > 64 and len(self.heap) > 2 * len(self.entries):
+            self.heap = [(deadline, seq, key) for key, (deadline, seq) in self.entries.items()]
+            heapq.heapify(self.heap)
+
+    def rearm(self):
+        while self.heap:
+            deadline, seq, key = self.heap[0]
+            if self.entries.get(key) == (deadline, seq):
+                break
+            heapq.heappop(self.heap)
+
+        if not self.heap:
+            self.timer.stop()
+            return
+
+        delay = (self.heap[0][0] - datetime.now()).total_seconds() * 1000
+        self.timer.start(int(min(max(delay, 0), self.MAX_INTERVAL)))
+
+
+ICS_ESCAPES = {"\\\\": "\\", "\\n": "\n", "\\N": "\n", "\\,": ",", "\\;": ";"}
+ICS_ESCAPE_RE = re.compile(r"\\[\\nN,;]")
+ICS_LIST_ITEM_RE = re.compile(r"(?:\\.|[^\\,])+")  # элемент списка через запятую, \, внутри элемента не делит
+ICS_EFFORT = "X-STUDY-ORGANIZER-EFFORT"
+
+
+def ics_unescape(value):
+    return ICS_ESCAPE_RE.sub(lambda match: ICS_ESCAPES[match.group(0)], value)
+
+
+def ics_escape(value):
+    return value.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\n", "\\n")
+
+
+def ics_fold(line):
+    # строки длиннее 75 байт переносятся, продолжение начинается с пробела
+    data = line.encode('utf-8')
+    if len(data) <= 75:
+        return line + "\r\n"
+    parts = []
+    while len(data) > 75:
+        cut = 75 if not parts else 74
+        while cut > 0 and (data[cut] & 0xC0) == 0x80:  # не резать символ UTF-8 посередине
+            cut -= 1
+        parts.append(data[:cut].decode('utf-8'))
+        data = data[cut:]
+    parts.append(data.decode('utf-8'))
+    return "\r\n ".join(parts) + "\r\n"
+
+
+def ics_datetime(value, params):
+    # UTC переводится в местное время, время с TZID и «плавающее» считаются местными
+    # strptime на десятках тысяч событий заметно медленнее разбора срезами
+    try:
+        if params.get("VALUE") == "DATE" or len(value) == 8:
+            return datetime(int(value[:4]), int(value[4:6]), int(value[6:8]), 23, 59), True
+        if value[8:9] != "T":
+            raise ValueError(value)
+        moment = datetime(int(value[:4]), int(value[4:6]), int(value[6:8]),
+                          int(value[9:11]), int(value[11:13]), int(value[13:15]))
+        if value.endswith("Z"):
+            moment = moment.replace(tzinfo=timezone.utc).astimezone().replace(tzinfo=None)
+        return moment, False
+    except ValueError:
+        return None, False
+
+
+def read_ics(path):
+    # Потоковое чтение .ics: файл читается построчно, наружу отдаются по одному VEVENT/VTODO
+    # в виде {свойство: (параметры, значение)}; в памяти держится только текущий компонент.
+    component = None
+    depth = 0
+    properties = None
+
+    def logical_lines(f):
+        pending = None
+        for raw in f:
+            line = raw.rstrip("\r\n")
+            if line[:1] in (" ", "\t") and pending is not None:
+                pending += line[1:]
+                continue
+            if pending is not None:
+                yield pending
+            pending = line
+        if pending:
+            yield pending
+
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        for line in logical_lines(f):
+            name_part, sep, value = line.partition(":")
+            if not sep:
+                continue
+            name, *raw_params = name_part.split(";")
+            name = name.upper()
+            if name == "BEGIN":
+                if component is None and value.upper() in ("VEVENT", "VTODO"):
+                    component, properties = value.upper(), {}
+                elif component is not None:
+                    depth += 1  # вложенные VALARM и т.п. пропускаются
+                continue
+            if name == "END":
+                if component is not None:
+                    if depth:
+                        depth -= 1
+                    elif value.upper() == component:
+                        yield component, properties
+                        component = properties = None
+                continue
+            if component is not None and not depth and name not in properties:
+                params = dict(param.partition("=")[::2] for param in raw_params)
+                properties[name] = ({key.upper(): item for key, item in params.items()}, value)
+
+
+def ics_task_record(properties):
+    # VTODO -> запись задачи в формате TaskStore.add_many; None, если задача закрыта или без срока
+    status = properties.get("STATUS", ({}, ""))[1].upper()
+    if status in ("COMPLETED", "CANCELLED"):
+        return None
+    params, value = properties.get("DUE") or properties.get("DTSTART") or ({}, "")
+    deadline, _ = ics_datetime(value, params)
+    if deadline is None:
+        return None
+    title = ics_unescape(properties.get("SUMMARY", ({}, "Без названия"))[1])
+    task_name = ics_unescape(properties.get("DESCRIPTION", ({}, ""))[1]) or title
+    categories = properties.get("CATEGORIES")
+    if categories is not None:
+        first = ICS_LIST_ITEM_RE.search(categories[1])  # список делится до снятия экранирования
+        subject = ics_unescape(first.group(0)) if first else ""
+    else:
+        subject = ics_unescape(properties.get("LOCATION", ({}, ""))[1])
+    try:
+        effort = max(1, int(properties.get(ICS_EFFORT, ({}, DEFAULT_EFFORT))[1]))
+    except ValueError:
+        effort = DEFAULT_EFFORT
+    column = "in_progress" if status == "IN-PROCESS" else "tasks"
+    recurrence = Recurrence.parse(properties.get("RRULE", ({}, ""))[1])
+    return title, deadline, task_name, subject, column, effort, recurrence
+
+
+def ics_note_row(properties):
+    # VEVENT -> строка заметки календаря на день начала: «чч:мм–чч:мм Название (место)».
+    # У событий на весь день текст берётся и из DESCRIPTION: так write_ics сохраняет многострочную заметку,
+    # первая строка которой повторена в SUMMARY
+    params, value = properties.get("DTSTART", ({}, ""))
+    start, all_day = ics_datetime(value, params)
+    if start is None:
+        return None
+    text = ics_unescape(properties.get("SUMMARY", ({}, "Событие"))[1])
+    description = ics_unescape(properties.get("DESCRIPTION", ({}, ""))[1]).strip()
+    if all_day and description:
+        text = description if description.split("\n", 1)[0].strip() == text.strip() else f"{text}\n{description}"
+    if not all_day:
+        end_params, end_value = properties.get("DTEND", ({}, ""))
+        end, _ = ics_datetime(end_value, end_params)
+        text = f"{start:%H:%M}" + (f"–{end:%H:%M}" if end is not None else "") + " " + text
+    location = properties.get("LOCATION")
+    if location:
+        text += f" ({ics_unescape(location[1])})"
+    return start.strftime("%Y-%m-%d"), text
+
+
+def ics_task_uid(task_id):
+    return f"task-{task_id}@study-organizer"
+
+
+def write_ics(path, tasks, calendar_notes):
+    # задачи -> VTODO, заметки календаря -> VEVENT на весь день; пишется по мере обхода
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        f.write("BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//Study Organizer//RU\r\n")
+        for task in tasks:
+            lines = ["BEGIN:VTODO", f"UID:{ics_task_uid(task.id)}", f"DTSTAMP:{stamp}",
+                     f"SUMMARY:{ics_escape(task.title)}", f"DESCRIPTION:{ics_escape(task.task_name)}",
+                     f"CATEGORIES:{ics_escape(task.subject)}",
+                     "STATUS:" + ("IN-PROCESS" if task.column == "in_progress" else "NEEDS-ACTION"),
+                     f"{ICS_EFFORT}:{task.effort}"]
+            if isinstance(task.deadline, datetime):
+                lines.append(f"DUE:{task.deadline:%Y%m%dT%H%M%S}")
+                if task.recurrence is not None:
+                    lines.append(f"RRULE:{task.recurrence.rule()}")
+            lines.append("END:VTODO")
+            f.write("".join(ics_fold(line) for line in lines))
+        for date, text in calendar_notes:
+            day = date.replace("-", "")
+            lines = ["BEGIN:VEVENT", f"UID:day-{date}@study-organizer", f"DTSTAMP:{stamp}",
+                     f"DTSTART;VALUE=DATE:{day}", f"SUMMARY:{ics_escape(text.strip().split(chr(10), 1)[0])}",
+                     f"DESCRIPTION:{ics_escape(text)}", "END:VEVENT"]
+            f.write("".join(ics_fold(line) for line in lines))
+        f.write("END:VCALENDAR\r\n")
+
+
+class StudyPlanner(QObject):
+    # Раскладывает открытые задачи по блокам помодоро (25 мин работы + 5 отдыха) в учебные часы.
+    # Порядок - по ближайшему дедлайну (EDF); если к очередному дедлайну блоков не хватает, из принятых
+    # выбрасывается самая трудоёмкая задача (Мур-Ходжсон), так число опаздывающих задач минимально.
+    # Опаздывающие задачи ставятся в конец плана и помечаются.
+    BLOCK = 30
+    WORK = 25
+    DAY_START = 9 * 60
+    DAY_END = 21 * 60
+
+    planChanged = pyqtSignal()
+
+    def __init__(self, store, parent=None):
+        super().__init__(parent)
+        self.store = store
+        self.order = []  # (дедлайн, id), отсортирован; поддерживается при каждом изменении задачи
+        self.keys = {}
+        self.runs = []  # (id, первый блок, число блоков, успевает ли)
+        self.late = set()
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.plan)
+        store.taskAdded.connect(self.onTaskChanged)
+        store.taskUpdated.connect(self.onTaskChanged)
+        store.taskRemoved.connect(self.onTaskRemoved)
+        store.tasksReset.connect(self.onTasksReset)
+        self.onTasksReset()
+
+    @property
+    def slots_per_day(self):
+        return (self.DAY_END - self.DAY_START) // self.BLOCK
+
+    def slot_start(self, slot):
+        day, index = divmod(slot, self.slots_per_day)
+        return datetime.fromordinal(day) + timedelta(minutes=self.DAY_START + index * self.BLOCK)
+
+    def first_slot(self, now):
+        # первый блок, который ещё не начался
+        minutes = now.hour * 60 + now.minute + now.second / 60
+        index = math.ceil((minutes - self.DAY_START) / self.BLOCK)
+        return now.toordinal() * self.slots_per_day + min(max(index, 0), self.slots_per_day)
+
+    def slots_until(self, deadline):
+        # номер первого блока, рабочая часть которого уже не укладывается до дедлайна
+        minutes = deadline.hour * 60 + deadline.minute
+        index = (minutes - self.DAY_START - self.WORK) // self.BLOCK + 1
+        return deadline.toordinal() * self.slots_per_day + min(max(index, 0), self.slots_per_day)
+
+    def onTaskChanged(self, task_id, old_column=None):
+        task = self.store.get(task_id)
+        key = (task.deadline, task_id) if isinstance(task.deadline, datetime) else None
+        if self.keys.get(task_id) != key:
+            self.removeKey(task_id)
+            if key is not None:
+                self.keys[task_id] = key
+                self.order.insert(bisect_left(self.order, key), key)
+        self.replanSoon()
+
+    def onTaskRemoved(self, task_id, column=None):
+        self.removeKey(task_id)
+        self.replanSoon()
+
+    def onTasksReset(self):
+        self.keys = {task.id: (task.deadline, task.id) for task in self.store.tasks.values()
+                     if isinstance(task.deadline, datetime)}
+        self.order = sorted(self.keys.values())
+        self.replanSoon()
+
+    def removeKey(self, task_id):
+        key = self.keys.pop(task_id, None)
+        if key is not None:
+            del self.order[bisect_left(self.order, key)]
+
+    def replanSoon(self):
+        # пачка изменений (загрузка, архивирование) даёт один пересчёт
+        if not self.timer.isActive():
+            self.timer.start(0)
+
+    def plan(self, now=None):
+        self.timer.stop()
+        first = self.first_slot(now or datetime.now())
+        tasks = self.store.tasks
+        accepted = []
+        total = 0
+        late = set()
+        for deadline, task_id in self.order:
+            effort = tasks[task_id].effort
+            heapq.heappush(accepted, (-effort, task_id))
+            total += effort
+            capacity = self.slots_until(deadline) - first
+            while total > capacity and accepted:
+                effort, dropped = heapq.heappop(accepted)
+                total += effort
+                late.add(dropped)
+
+        runs = []
+        slot = first
+        for on_time in (True, False):
+            for deadline, task_id in self.order:
+                if (task_id in late) != on_time:
+                    effort = tasks[task_id].effort
+                    runs.append((task_id, slot, effort, on_time))
+                    slot += effort
+        self.runs = runs
+        self.late = late
+        self.planChanged.emit()
+
+    def finish_time(self, first_slot, count):
+        return self.slot_start(first_slot + count - 1) + timedelta(minutes=self.WORK)
 
 
 class Deadlines(QMainWindow):
-    def __init__(self):
+    FILTER_PERIODS = [("Любой срок", None), ("Сегодня", "day"), ("Эта неделя", "week"), ("Этот месяц", "month")]
+    REMOTE_RELOAD_LIMIT = 1000
+    DEADLINE_RETRY = timedelta(seconds=5)  # через сколько повторить проверку, если база была занята
+    # напоминания: минут до срока; выбранные хранятся в meta через запятую
+    REMINDER_OFFSETS = [("За неделю", 7 * 24 * 60), ("За день", 24 * 60), ("За 3 часа", 3 * 60), ("За час", 60),
+                        ("За 15 минут", 15)]
+    DEFAULT_REMINDERS = "1440,60"
+
+    remindersDue = pyqtSignal(list)  # [(id задачи, минут до срока)]
+
+    def __init__(self, db=None):
         super().__init__()
+        self.store = TaskStore(self)
+        self.db = db or get_database()
+        self.reminder_offsets = [int(minutes) for minutes in
+                                 self.db.get_meta("reminder_offsets", self.DEFAULT_REMINDERS).split(",") if minutes]
+        self.store.allocate_ids = lambda minimum, count: self.db.allocate_ids("next_task_id", minimum, count)
+        # каждое изменение задачи сразу ставится в очередь записи базы, saveTasks отдаёт её фоновому потоку
+        self.applyingRemote = False
+        self.store.taskAdded.connect(self.persistTask)
+        self.store.taskUpdated.connect(self.persistTask)
+        self.store.taskRemoved.connect(self.unpersistTask)
+        self.db.watcher.tasksChanged.connect(self.applyRemoteTasks)
+        self.db.watcher.resyncNeeded.connect(self.loadTasks)
+        self.history = get_history()
+        self.history.register("task", self.applyHistory)
+        self.day_index = get_day_index()
+        self.store.taskAdded.connect(self.indexTaskDay)
+        self.store.taskUpdated.connect(self.indexTaskDay)
+        self.store.taskRemoved.connect(lambda task_id, column: self.day_index.remove_task(task_id))
+        self.store.tasksReset.connect(lambda: self.day_index.reset_tasks(self.store.tasks.values()))
+        self.store.taskAdded.connect(self.scheduleTask)
+        self.store.taskUpdated.connect(self.scheduleTask)
+        self.store.taskRemoved.connect(self.unscheduleTask)
+        self.store.tasksReset.connect(self.rescheduleAll)
+        self.delegate = TaskCardDelegate(self)
+        self.delegate.menuRequested.connect(self.showTaskMenu)
+        self.planner = StudyPlanner(self.store, self)
         self.initUI()
-        self.archiveWindow = ArchiveWindow()
-        self.loadTasks()
+        self.archiveWindow = ArchiveWindow(self.db)
         self.initTimer()
+        self.loadTasks()
 
     def initUI(self):
         self.setWindowTitle('Задачи и дедлайны')
@@ -312,9 +2585,36 @@ class Deadlines(QMainWindow):
             }
         """)
         archiveButton.clicked.connect(self.showArchive)
+        icsButton = QPushButton("Календарь .ics")
+        icsButton.setStyleSheet("""
+            QPushButton {
+                background-color: #52CC7A;
+                color: white;
+                border-radius: 15px;
+                padding: 10px 20px;
+            }
+            QPushButton:hover {
+                background-color: #45b367;
+            }
+        """)
+        icsMenu = QMenu(icsButton)
+        icsMenu.addAction('Импорт из .ics', self.showImportDialog)
+        icsMenu.addAction('Экспорт в .ics', self.showExportDialog)
+        icsButton.setMenu(icsMenu)
+        reminderButton = QPushButton("Напоминания")
+        reminderButton.setStyleSheet(icsButton.styleSheet())
+        reminderMenu = QMenu(reminderButton)
+        for title, minutes in self.REMINDER_OFFSETS:
+            action = reminderMenu.addAction(title)
+            action.setCheckable(True)
+            action.setChecked(minutes in self.reminder_offsets)
+            action.toggled.connect(lambda checked, minutes=minutes: self.setReminder(minutes, checked))
+        reminderButton.setMenu(reminderMenu)
 
         headerRightLayout.addWidget(addButton)
         headerRightLayout.addWidget(archiveButton)
+        headerRightLayout.addWidget(icsButton)
+        headerRightLayout.addWidget(reminderButton)
 
         headerLayout.addWidget(titleLabel)
         headerLayout.addWidget(descriptionLabel)
@@ -322,33 +2622,42 @@ class Deadlines(QMainWindow):
 
         mainLayout.addLayout(headerLayout)
 
+        filterLayout = QHBoxLayout()
+        self.subjectFilter = QComboBox()
+        self.subjectFilter.addItem("Все предметы", None)
+        self.periodFilter = QComboBox()
+        for title, period in self.FILTER_PERIODS:
+            self.periodFilter.addItem(title, period)
+        self.statusFilter = QComboBox()
+        self.statusFilter.addItem("Все колонки", None)
+        for column, title in COLUMN_TITLES.items():
+            self.statusFilter.addItem(title, column)
+        self.sortOrder = QComboBox()
+        self.sortOrder.addItem("По добавлению", TaskListModel.SORT_ADDED)
+        self.sortOrder.addItem("По сроку", TaskListModel.SORT_DEADLINE)
+        for box in (self.subjectFilter, self.periodFilter, self.statusFilter, self.sortOrder):
+            box.currentIndexChanged.connect(self.applyFilter)
+            filterLayout.addWidget(box)
+        filterLayout.addStretch()
+        self.store.index.subjectsChanged.connect(self.updateSubjectFilter)
+        mainLayout.addLayout(filterLayout)
+
         contentLayout = QHBoxLayout()
 
         tasksColumn = QVBoxLayout()
         tasksTitle = QLabel("Задачи")
-        tasksScroll = QScrollArea()
-        tasksWidget = QWidget()
-        self.tasksLayout = QVBoxLayout()
-
-        tasksWidget.setLayout(self.tasksLayout)
-        tasksScroll.setWidget(tasksWidget)
-        tasksScroll.setWidgetResizable(True)
+        self.tasksView = self.createBoardView("tasks")
 
         tasksColumn.addWidget(tasksTitle)
-        tasksColumn.addWidget(tasksScroll)
+        tasksColumn.addWidget(self.tasksView)
 
         inProgressColumn = QVBoxLayout()
         inProgressTitle = QLabel("В процессе")
-        inProgressScroll = QScrollArea()
-        inProgressWidget = QWidget()
-        self.inProgressLayout = QVBoxLayout()
-
-        inProgressWidget.setLayout(self.inProgressLayout)
-        inProgressScroll.setWidget(inProgressWidget)
-        inProgressScroll.setWidgetResizable(True)
+        self.inProgressView = self.createBoardView("in_progress")
 
         inProgressColumn.addWidget(inProgressTitle)
-        inProgressColumn.addWidget(inProgressScroll)
+        inProgressColumn.addWidget(self.inProgressView)
+        self.boardColumns = {"tasks": (tasksTitle, self.tasksView), "in_progress": (inProgressTitle, self.inProgressView)}
 
         contentLayout.addLayout(tasksColumn)
         contentLayout.addLayout(inProgressColumn)
@@ -361,123 +2670,483 @@ class Deadlines(QMainWindow):
     def showAddTaskDialog(self):
         dialog = AddTaskDialog()
         if dialog.exec():
-            title, deadline, task_name, subject, category = dialog.getTaskData()
-            task = TaskCard(title, deadline, task_name, subject)
-            if category == "Задачи":
-                self.tasksLayout.addWidget(task)
-            else:
-                self.inProgressLayout.addWidget(task)
+            title, deadline, task_name, subject, category, effort = dialog.getTaskData()
+            task = self.store.add(title, deadline, task_name, subject, COLUMN_BY_TITLE[category], effort=effort,
+                                  recurrence=dialog.getRecurrence())
+            self.history.record("Добавление задачи", "task", task.id, None, self.historyFields(task))
             self.saveTasks()
 
+    def editTask(self, task_id):
+        task = self.store.get(task_id)
+        dialog = AddTaskDialog()
+        dialog.titleEdit.setText(task.title)
+        if isinstance(task.deadline, datetime):
+            dialog.deadlineEdit.setDateTime(task.deadline)
+        dialog.taskNameEdit.setText(task.task_name)
+        dialog.subjectEdit.setText(task.subject)
+        dialog.categoryComboBox.setCurrentText(COLUMN_TITLES[task.column])
+        dialog.effortEdit.setValue(task.effort)
+        dialog.setRecurrence(task.recurrence)
+
+        if dialog.exec():
+            before = self.historyFields(task)
+            title, deadline, task_name, subject, category, effort = dialog.getTaskData()
+            self.store.update(task_id, title=title, deadline=deadline, task_name=task_name,
+                              subject=subject, column=COLUMN_BY_TITLE[category], effort=effort,
+                              recurrence=dialog.getRecurrence())
+            self.history.record("Изменение задачи", "task", task_id, before, self.historyFields(task))
+            self.saveTasks()
+
+    def deleteTask(self, task_id):
+        task = self.store.remove(task_id)
+        self.history.record("Удаление задачи", "task", task_id, self.historyFields(task), None)
+        self.saveTasks()
+
+    HISTORY_FIELDS = ("title", "deadline", "task_name", "subject", "column", "effort", "recurrence")
+
+    @staticmethod
+    def historyFields(task):
+        data = task.to_dict()
+        data["column"] = task.column
+        del data["id"]
+        return data
+
+    def applyHistory(self, task_id, fields):
+        # шаг отмены/повтора; удалённая задача восстанавливается только по полному снимку полей
+        task = self.store.get(task_id)
+        if fields is not None and "recurrence" in fields:
+            fields = dict(fields, recurrence=Recurrence.parse(fields["recurrence"]))
+        if fields is None:
+            if task is not None:
+                self.store.remove(task_id)
+        elif task is not None:
+            self.store.update(task_id, **fields)
+        elif all(name in fields for name in self.HISTORY_FIELDS):
+            self.store.add(fields["title"], fields["deadline"], fields["task_name"], fields["subject"],
+                           fields["column"], task_id=task_id, effort=fields["effort"], recurrence=fields["recurrence"])
+        self.saveTasks()
+
+    def archiveTask(self, task_id):
+        self.archiveTasks([task_id])
+        self.saveTasks()
+
+    def archiveTasks(self, task_ids):
+        # задача переезжает в таблицу архива и больше не загружается вместе с доской
+        tasks = [self.store.remove(task_id) for task_id in task_ids]
+        self.db.archive_tasks(tasks)
+        self.archiveWindow.tasksArchived()
+
+    def showImportDialog(self):
+        path, _ = QFileDialog.getOpenFileName(self, "Импорт календаря", "", "iCalendar (*.ics)")
+        if path:
+            tasks_count, events_count = self.importCalendar(path)
+            QMessageBox.information(self, "Импорт", f"Задач: {tasks_count}\nСобытий в календаре: {events_count}")
+
+    def showExportDialog(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Экспорт календаря", "organizer.ics", "iCalendar (*.ics)")
+        if path:
+            self.db.flush()
+            tasks = self.store.filter(lambda task: True)
+            # свой же файл, импортированный обратно, узнаётся по UID и не дублирует задачи
+            self.db.save_ics_task_ids([(ics_task_uid(task.id), task.id) for task in tasks])
+            self.db.commit()
+            write_ics(path, tasks, self.db.iter_calendar_notes())
+
+    def importCalendar(self, path, chunk_size=1000):
+        # События уходят в базу порциями по мере чтения файла, в памяти держится одна порция и множество дат.
+        # Задачи добавляются в хранилище одним пакетом (один tasksReset и одна запись в базу): они всё равно
+        # окажутся в TaskStore целиком, так что буфер записей того же порядка, что и сама доска.
+        self.db.flush()  # связи UID из прошлого импорта могут ещё стоять в очереди записи
+        records = []
+        uids = []
+        rows = []
+        dates = set()
+        events_count = 0
+        for component, properties in read_ics(path):
+            if component == "VTODO":
+                record = ics_task_record(properties)
+                if record is not None:
+                    records.append(record)
+                    uids.append(properties.get("UID", ({}, None))[1])
+            else:
+                row = ics_note_row(properties)
+                if row is not None:
+                    rows.append(row)
+                    dates.add(row[0])
+                    events_count += 1
+                    if len(rows) >= chunk_size:
+                        self.appendCalendarRows(rows)
+                        rows = []
+        self.appendCalendarRows(rows)
+
+        # задачи с уже знакомым UID обновляются на месте (только если в файле что-то изменилось);
+        # удалённые или архивированные с доски не возвращаются
+        known = self.db.ics_task_ids([uid for uid in uids if uid])
+        new_records = []
+        new_uids = []
+        updated = 0
+        seen = set()
+        for uid, record in zip(uids, records):
+            if uid:
+                if uid in seen:
+                    continue  # переопределения экземпляров серии (RECURRENCE-ID) с тем же UID
+                seen.add(uid)
+            task_id = known.get(uid) if uid else None
+            if task_id is None:
+                new_records.append(record)
+                new_uids.append(uid)
+                continue
+            task = self.store.get(task_id)
+            if task is None:
+                continue
+            title, deadline, task_name, subject, column, effort, recurrence = record
+            fields = {"title": title, "deadline": deadline, "task_name": task_name, "subject": subject,
+                      "column": column, "effort": effort, "recurrence": recurrence}
+            if any(getattr(task, name) != value for name, value in fields.items()):
+                self.store.update(task_id, **fields)
+                updated += 1
+
+        tasks = self.store.add_many(new_records)
+        self.db.put_tasks(tasks)
+        self.db.save_ics_task_ids([(uid, task.id) for uid, task in zip(new_uids, tasks) if uid])
+        self.db.commit()
+        if dates:
+            self.day_index.add_notes(dates)
+        return len(tasks) + updated, events_count
+
+    def appendCalendarRows(self, rows):
+        # строки порции склеиваются по дням, чтобы заметка дня переписывалась (и переиндексировалась) один раз
+        texts = {}
+        for date, text in rows:
+            texts[date] = merge_lines(texts.get(date), text)
+        if texts:
+            self.db.append_calendar_notes(list(texts.items()))
+            self.db.commit()
+
     def showArchive(self):
         self.archiveWindow.show()
 
-    def archiveTask(self, task):
-        self.archiveWindow.addArchivedTask(task)
-        self.saveTasks()
+    def createBoardView(self, column):
+        view = QListView()
+        view.setModel(TaskListModel(self.store, column, view))
+        view.setItemDelegate(self.delegate)
+        view.setUniformItemSizes(True)  # высота строк не пересчитывается для каждой задачи
+        view.setLayoutMode(QListView.LayoutMode.Batched)  # раскладка порциями, не блокирует первый показ
+        view.setBatchSize(200)
+        view.setVerticalScrollMode(QListView.ScrollMode.ScrollPerPixel)
+        view.setEditTriggers(QListView.EditTrigger.NoEditTriggers)
+        view.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
+        view.customContextMenuRequested.connect(
+            lambda pos, view=view: self.showViewMenu(view, pos))
+        view.doubleClicked.connect(lambda index: self.editTask(index.data(TaskListModel.TaskRole).id))
+        return view
+
+    def showViewMenu(self, view, pos):
+        index = view.indexAt(pos)
+        if index.isValid():
+            self.showTaskMenu(index.data(TaskListModel.TaskRole).id, view.viewport().mapToGlobal(pos))
+
+    def showTaskMenu(self, task_id, pos):
+        menu = QMenu(self)
+        editAction = QAction('Редактировать', self)
+        deleteAction = QAction('Удалить', self)
+        archiveAction = QAction('Добавить в архив', self)
 
-    def saveTasks(self):
-        tasks = []
-        in_progress = []
-        archived = []
+        menu.addAction(editAction)
+        menu.addAction(deleteAction)
+        menu.addAction(archiveAction)
 
-        for i in range(self.tasksLayout.count()):
-            task = self.tasksLayout.itemAt(i).widget()
-            if task:
-                tasks.append({
-                    "title": task.titleLabel.text(),
-                    "deadline": task.deadlineLabel.text(),
-                    "task_name": task.taskNameLabel.text(),
-                    "subject": task.subjectLabel.text()
-                })
-
-        for i in range(self.inProgressLayout.count()):
-            task = self.inProgressLayout.itemAt(i).widget()
-            if task:
-                in_progress.append({
-                    "title": task.titleLabel.text(),
-                    "deadline": task.deadlineLabel.text(),
-                    "task_name": task.taskNameLabel.text(),
-                    "subject": task.subjectLabel.text()
-                })
-
-        for i in range(self.archiveWindow.tasksLayout.count()):
-            task = self.archiveWindow.tasksLayout.itemAt(i).widget()
-            if task:
-                archived.append({
-                    "title": task.titleLabel.text(),
-                    "deadline": task.deadlineLabel.text(),
-                    "task_name": task.taskNameLabel.text(),
-                    "subject": task.subjectLabel.text()
-                })
-
-        data = {
-            "tasks": tasks,
-            "in_progress": in_progress,
-            "archived": archived
-        }
+        editAction.triggered.connect(lambda: self.editTask(task_id))
+        deleteAction.triggered.connect(lambda: self.deleteTask(task_id))
+        archiveAction.triggered.connect(lambda: self.archiveTask(task_id))
 
-        with open('tasks.json', 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=4)
+        menu.exec(pos)
+
+    def scheduleTask(self, task_id, old_column=None):
+        task = self.store.get(task_id)
+        if isinstance(task.deadline, datetime):
+            self.scheduler.schedule(task.id, task.deadline)
+        else:
+            self.scheduler.unschedule(task.id)
+        for minutes in self.reminder_offsets:
+            self.reminders.unschedule((task_id, minutes))
+        for key, moment in self.reminderTimes(task, datetime.now()):
+            self.reminders.schedule(key, moment)
+
+    def unscheduleTask(self, task_id, column=None):
+        self.scheduler.unschedule(task_id)
+        for minutes in self.reminder_offsets:
+            self.reminders.unschedule((task_id, minutes))
+
+    def reminderTimes(self, task, now):
+        # уже прошедшие напоминания не ставятся, иначе запуск программы выдал бы их все разом
+        if isinstance(task.deadline, datetime):
+            for minutes in self.reminder_offsets:
+                moment = task.deadline - timedelta(minutes=minutes)
+                if moment > now:
+                    yield (task.id, minutes), moment
+
+    def setReminder(self, minutes, enabled):
+        offsets = set(self.reminder_offsets)
+        if enabled:
+            offsets.add(minutes)
+        else:
+            offsets.discard(minutes)
+        self.reminder_offsets = sorted(offsets, reverse=True)
+        self.db.set_meta("reminder_offsets", ",".join(map(str, self.reminder_offsets)))
+        self.db.commit()
+        self.rescheduleReminders()
+
+    def indexTaskDay(self, task_id, old_column=None):
+        task = self.store.get(task_id)
+        self.day_index.set_task(task_id, task.deadline, task.recurrence)
+
+    def persistTask(self, task_id, old_column=None):
+        # счётчик id в meta двигает allocate_ids при выдаче блока
+        if not self.applyingRemote:
+            self.db.put_task(self.store.get(task_id))
+
+    def unpersistTask(self, task_id, column=None):
+        if not self.applyingRemote:
+            self.db.delete_task(task_id)
+
+    def applyRemoteTasks(self, task_ids):
+        # Задачи, изменённые другой копией органайзера. Они уже в базе, поэтому на время применения
+        # сигналы хранилища не ставят записи в очередь. Большая пачка дешевле одним сбросом.
+        if len(task_ids) > self.REMOTE_RELOAD_LIMIT:
+            self.loadTasks()
+            return
+        tasks = self.db.load_tasks_by_id(task_ids)
+        self.applyingRemote = True
+        try:
+            for task_id in task_ids:
+                task = tasks.get(task_id)
+                if task is None:
+                    if self.store.get(task_id) is not None:
+                        self.store.remove(task_id)
+                elif self.store.get(task_id) is None:
+                    self.store.add(task.title, task.deadline, task.task_name, task.subject, task.column,
+                                   task_id=task_id, effort=task.effort, recurrence=task.recurrence)
+                else:
+                    self.store.update(task_id, title=task.title, deadline=task.deadline, task_name=task.task_name,
+                                      subject=task.subject, column=task.column, effort=task.effort,
+                                      recurrence=task.recurrence)
+        finally:
+            self.applyingRemote = False
+
+    def period_range(self, period, now=None):
+        # границы срока [начало, конец) для фильтра доски
+        if period is None:
+            return None, None
+        today = datetime.combine((now or datetime.now()).date(), datetime.min.time())
+        if period == "day":
+            return today, today + timedelta(days=1)
+        if period == "week":
+            return today, today + timedelta(days=7 - today.weekday())
+        next_month = (today.replace(day=1) + timedelta(days=32)).replace(day=1)
+        return today, next_month
+
+    def applyFilter(self):
+        start, end = self.period_range(self.periodFilter.currentData())
+        subject = self.subjectFilter.currentData()
+        sort = self.sortOrder.currentData()
+        status = self.statusFilter.currentData()
+        for column, (title, view) in self.boardColumns.items():
+            visible = status is None or status == column
+            title.setVisible(visible)
+            view.setVisible(visible)
+            view.model().setFilter(subject, start, end, sort)
+
+    def updateSubjectFilter(self):
+        current = self.subjectFilter.currentData()
+        subjects = self.store.index.subject_names()
+        self.subjectFilter.blockSignals(True)
+        self.subjectFilter.clear()
+        self.subjectFilter.addItem("Все предметы", None)
+        for subject in subjects:
+            self.subjectFilter.addItem(subject, subject)
+        position = self.subjectFilter.findData(current) if current is not None else 0
+        self.subjectFilter.setCurrentIndex(max(position, 0))
+        self.subjectFilter.blockSignals(False)
+        if current is not None and position < 0:
+            self.applyFilter()  # последняя задача предмета ушла, фильтр сбрасывается
+
+    def resetFilter(self):
+        for box in (self.subjectFilter, self.periodFilter, self.statusFilter):
+            box.blockSignals(True)
+            box.setCurrentIndex(0)
+            box.blockSignals(False)
+        self.applyFilter()
+
+    def selectTask(self, task_id):
+        task = self.store.get(task_id)
+        if task is None:
+            return
+        view = self.tasksView if task.column == "tasks" else self.inProgressView
+        if view.model().rowOf(task_id) is None or not view.isVisibleTo(self):
+            self.resetFilter()  # найденная задача скрыта фильтром
+        index = view.model().index(view.model().rowOf(task_id))
+        view.setCurrentIndex(index)
+        view.scrollTo(index)
+
+    def rescheduleAll(self):
+        self.scheduler.reset((task.id, task.deadline) for task in self.store.tasks.values()
+                             if isinstance(task.deadline, datetime))
+        self.rescheduleReminders()
+
+    def rescheduleReminders(self):
+        now = datetime.now()
+        self.reminders.reset(item for task in self.store.tasks.values() for item in self.reminderTimes(task, now))
+
+    def saveTasks(self):
+        # изменения уже поставлены в очередь через сигналы TaskStore, запись на диск идёт в фоне
+        self.db.commit()
 
     def loadTasks(self):
         try:
-            with open('tasks.json', 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                for task_data in data.get("tasks", []):
-                    task = TaskCard(task_data["title"], task_data["deadline"], task_data["task_name"], task_data["subject"])
-                    self.tasksLayout.addWidget(task)
-                for task_data in data.get("in_progress", []):
-                    task = TaskCard(task_data["title"], task_data["deadline"], task_data["task_name"], task_data["subject"])
-                    self.inProgressLayout.addWidget(task)
-                for task_data in data.get("archived", []):
-                    task = TaskCard(task_data["title"], task_data["deadline"], task_data["task_name"], task_data["subject"])
-                    self.archiveWindow.addArchivedTask(task)
-        except FileNotFoundError:
-            pass
+            self.store.load_dict(self.db.load_tasks())
+        except sqlite3.Error as e:
+            print(f"Ошибка при загрузке задач: {e}")
 
     def initTimer(self):
-        self.timer = QTimer(self)
-        self.timer.timeout.connect(self.checkDeadlines)
-        self.timer.start(60)
+        self.scheduler = DeadlineScheduler(self)
+        self.scheduler.due.connect(self.checkDeadlines)
+        # напоминания в отдельной куче: таймер взведён только на ближайшее, срабатывание - O(log n)
+        self.reminders = DeadlineScheduler(self)
+        self.reminders.due.connect(self.checkReminders)
+
+    def checkReminders(self):
+        # после сна компьютера могут наступить сразу несколько напоминаний одной задачи, остаётся ближайшее к сроку
+        now = datetime.now()
+        due = {}
+        for task_id, minutes in self.reminders.popDue(now):
+            task = self.store.get(task_id)
+            if task is not None and task.deadline > now:
+                due[task_id] = min(minutes, due.get(task_id, minutes))
+        if due:
+            self.remindersDue.emit(list(due.items()))
+        self.reminders.rearm()
+
+    @staticmethod
+    def passedOccurrences(task, now):
+        count = 0
+        deadline, recurrence = task.deadline, task.recurrence
+        while recurrence is not None and deadline <= now:
+            following = recurrence.next(deadline)
+            if following is None:
+                break
+            count += 1
+            deadline, recurrence = following
+        return count
 
     def checkDeadlines(self):
-        current_time = datetime.now()
+        now = datetime.now()
         tasks_to_archive = []
+        occurrences = []
+        series_ids = []
+        due = self.scheduler.popDue(now)
+        try:
+            # id для прошедших экземпляров серий берутся до того, как изменится хоть одна задача
+            self.store.ensure_ids(sum(self.passedOccurrences(self.store.get(task_id), now) for task_id in due))
+        except sqlite3.OperationalError as e:
+            if not database_busy(e):
+                raise
+            print(f"Проверка сроков отложена: {e}")
+            for task_id in due:
+                self.scheduler.schedule(task_id, now + self.DEADLINE_RETRY)
+            return
+        for task_id in due:
+            # у повторяющейся задачи в архив уходит прошедший экземпляр, а сама задача
+            # переходит на следующий срок; серия целиком архивируется после последнего
+            task = self.store.get(task_id)
+            deadline, recurrence = task.deadline, task.recurrence
+            while recurrence is not None and deadline <= now:
+                following = recurrence.next(deadline)
+                if following is None:
+                    break
+                occurrences.append(Task(self.store.reserve_id(), task.title, deadline, task.task_name, task.subject))
+                series_ids.append(task_id)
+                deadline, recurrence = following
+            if deadline <= now:
+                if deadline != task.deadline:
+                    # последний экземпляр серии уже прошёл: в архив он уходит со своим сроком
+                    self.store.update(task_id, deadline=deadline, recurrence=None)
+                tasks_to_archive.append(task_id)
+            else:
+                self.store.update(task_id, deadline=deadline, recurrence=recurrence, column="tasks")
+
+        if occurrences:
+            self.db.archive_tasks(occurrences, series_ids)
+            self.archiveWindow.tasksArchived()
+        if tasks_to_archive:
+            self.archiveTasks(tasks_to_archive)
+        if occurrences or tasks_to_archive:
+            self.saveTasks()
+        self.scheduler.rearm()
 
-        for i in range(self.tasksLayout.count()):
-            task = self.tasksLayout.itemAt(i).widget()
-            if task:
-                try:
-                    deadline = datetime.strptime(task.deadlineLabel.text(), '%d.%m.%Y %H:%M')
-                    if current_time >= deadline:
-                        tasks_to_archive.append(task)
-                except ValueError:
-                    pass
+def monotonic_now():
+    # CLOCK_BOOTTIME идёт и во время сна ноутбука, обычный monotonic в Linux на это время останавливается
+    if hasattr(time, "CLOCK_BOOTTIME"):
+        return time.clock_gettime(time.CLOCK_BOOTTIME)
+    return time.monotonic()
 
-        for task in tasks_to_archive:
-            task.setParent(None)
-            self.archiveTask(task)
 
-        tasks_to_archive.clear()
+class PomodoroClock:
+    # Расписание сессии задаётся моментом старта и длительностью: фаза и остаток времени вычисляются
+    # из текущего показания часов, поэтому пропущенные или поздние тики не накапливают ошибку.
+    WORK = 25 * 60
+    REST = 5 * 60
 
-        for i in range(self.inProgressLayout.count()):
-            task = self.inProgressLayout.itemAt(i).widget()
-            if task:
-                try:
-                    deadline = datetime.strptime(task.deadlineLabel.text(), '%d.%m.%Y %H:%M')
-                    if current_time >= deadline:
-                        tasks_to_archive.append(task)
-                except ValueError:
-                    pass
+    def __init__(self):
+        self.started = None
+        self.ends = None
+        self.phase = 0  # чётные - работа, нечётные - перерыв
+
+    @property
+    def running(self):
+        return self.started is not None
+
+    def start(self, now, duration):
+        self.started = now
+        self.ends = now + duration
+        self.phase = 0
+
+    def stop(self):
+        self.started = None
+        self.ends = None
+
+    def phase_at(self, now):
+        elapsed = min(now, self.ends) - self.started
+        cycles, offset = divmod(elapsed, self.WORK + self.REST)
+        return int(cycles) * 2 + (1 if offset >= self.WORK else 0)
+
+    def phase_start(self, phase=None):
+        if phase is None:
+            phase = self.phase
+        return self.started + (phase // 2) * (self.WORK + self.REST) + (0 if phase % 2 == 0 else self.WORK)
+
+    def phase_end(self, phase=None):
+        if phase is None:
+            phase = self.phase
+        end = self.started + (phase // 2) * (self.WORK + self.REST) + (self.WORK if phase % 2 == 0 else self.WORK + self.REST)
+        return min(end, self.ends)
+
+    def advance(self, now):
+        # возвращает номера завершившихся с прошлого вызова фаз и признак конца сессии
+        phase = self.phase_at(now)
+        finished = list(range(self.phase, phase))
+        self.phase = phase
+        return finished, now >= self.ends
+
+    @property
+    def is_work(self):
+        return self.phase % 2 == 0
 
-        for task in tasks_to_archive:
-            task.setParent(None)
-            self.archiveTask(task)
 
 class PomodoroTimer(QWidget):
-    def __init__(self):
+    def __init__(self, planner=None):
         super().__init__()
+        self.planner = planner
         self.work_quotes = [
             "Отличная работа! Еще немного, и заслуженный отдых.",
             "Ты справляешься отлично! Скоро перерыв.",
@@ -517,11 +3186,16 @@ class PomodoroTimer(QWidget):
             "breaks": 0,
             "completed_sessions": 0
         }
+        self.db = get_database()
         self.load_achievements()
-        self.initUI()
-        self.timer = QTimer()
+        self.clock = PomodoroClock()
+        # таймер взводится однократно: на смену секунды, пока таймер виден, иначе только на конец фазы
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
         self.timer.timeout.connect(self.update_timer)
         self.is_work_session = True
+        self.watched_window = None
+        self.initUI()
 
     def initUI(self):
         self.setWindowTitle('Помодоро Таймер')
@@ -590,6 +3264,29 @@ class PomodoroTimer(QWidget):
 
         timer_layout.addLayout(timer_buttons_layout)
 
+        subject_layout = QHBoxLayout()
+        subject_layout.addWidget(QLabel("Предмет:", self))
+        self.subject_box = QComboBox(self)
+        self.subject_box.setEditable(True)
+        self.subject_box.addItems([""] + self.db.task_subjects())
+        subject_layout.addWidget(self.subject_box, 1)
+        timer_layout.addLayout(subject_layout)
+
+        self.plan_model = QStandardItemModel(self)
+        if self.planner is not None:
+            plan_title = QLabel("План занятий (двойной щелчок - начать):", self)
+            timer_layout.addWidget(plan_title)
+            self.plan_view = QListView(self)
+            self.plan_view.setModel(self.plan_model)
+            self.plan_view.setEditTriggers(QListView.EditTrigger.NoEditTriggers)
+            self.plan_view.setUniformItemSizes(True)
+            self.plan_view.setMaximumHeight(150)
+            self.plan_view.doubleClicked.connect(
+                lambda index: self.start_task(index.data(Qt.ItemDataRole.UserRole)))
+            timer_layout.addWidget(self.plan_view)
+            self.planner.planChanged.connect(self.update_plan)
+            self.update_plan()
+
         content_layout = QHBoxLayout()
 
         self.circle_icon = QLabel(self)
@@ -637,15 +3334,15 @@ class PomodoroTimer(QWidget):
         icons_layout.setSpacing(20)
 
         self.work_icon = QLabel(self)
-        self.work_icon.setPixmap(QPixmap('work_icon.png').scaled(50, 50, Qt.AspectRatioMode.KeepAspectRatio))
+        self.work_icon.setPixmap(get_assets().get('work_icon.png', 50))
         icons_layout.addWidget(self.work_icon, 0, 0, Qt.AlignmentFlag.AlignCenter)
 
         self.break_icon = QLabel(self)
-        self.break_icon.setPixmap(QPixmap('break_icon.png').scaled(50, 50, Qt.AspectRatioMode.KeepAspectRatio))
+        self.break_icon.setPixmap(get_assets().get('break_icon.png', 50))
         icons_layout.addWidget(self.break_icon, 0, 1, Qt.AlignmentFlag.AlignCenter)
 
         self.complete_icon = QLabel(self)
-        self.complete_icon.setPixmap(QPixmap('complete_icon.png').scaled(50, 50, Qt.AspectRatioMode.KeepAspectRatio))
+        self.complete_icon.setPixmap(get_assets().get('complete_icon.png', 50))
         icons_layout.addWidget(self.complete_icon, 0, 2, Qt.AlignmentFlag.AlignCenter)
 
         achievements_layout.addLayout(icons_layout)
@@ -683,52 +3380,92 @@ class PomodoroTimer(QWidget):
         """)
         self.help_button.setMaximumWidth(30)
         self.help_button.clicked.connect(self.show_help)
-        timer_layout.addWidget(self.help_button, alignment=Qt.AlignmentFlag.AlignRight)
+
+        self.stats_button = QPushButton('Статистика', self)
+        self.stats_button.setStyleSheet("""
+            QPushButton {
+                background-color: #52CC7A;
+                color: white;
+                border-radius: 15px;
+                padding: 8px 13px;
+            }
+            QPushButton:hover {
+                background-color: #45b367;
+            }
+        """)
+        self.stats_button.clicked.connect(self.show_statistics)
+
+        bottom_layout = QHBoxLayout()
+        bottom_layout.addStretch(1)
+        bottom_layout.addWidget(self.stats_button)
+        bottom_layout.addWidget(self.help_button)
+        timer_layout.addLayout(bottom_layout)
 
         self.setLayout(timer_layout)
         self.show()
 
     def update_circle_icon(self, state):
+        assets = get_assets()
         if state == 'work':
-            self.circle_icon.setPixmap(QPixmap('work_icon.png').scaled(100, 100, Qt.AspectRatioMode.KeepAspectRatio))
+            self.circle_icon.setPixmap(assets.get('work_icon.png', 100))
         elif state == 'rest':
-            self.circle_icon.setPixmap(QPixmap('break_icon.png').scaled(100, 100, Qt.AspectRatioMode.KeepAspectRatio))
+            self.circle_icon.setPixmap(assets.get('break_icon.png', 100))
         elif state == 'complete':
-            self.circle_icon.setPixmap(
-                QPixmap('complete_icon.png').scaled(100, 100, Qt.AspectRatioMode.KeepAspectRatio))
+            self.circle_icon.setPixmap(assets.get('complete_icon.png', 100))
         else:
-            self.circle_icon.setPixmap(QPixmap('idle_icon.png').scaled(200, 200, Qt.AspectRatioMode.KeepAspectRatio))
+            self.circle_icon.setPixmap(assets.get('idle_icon.png', 200))
 
     def start_timer(self, hours):
-        self.work_time = hours * 3600
-        self.remaining_time = 25 * 60
+        self.start_session(hours * 3600)
+
+    def start_task(self, task_id):
+        task = self.planner.store.get(task_id)
+        if task is None:
+            return
+        self.subject_box.setCurrentText(task.subject)
+        self.start_session(task.effort * (PomodoroClock.WORK + PomodoroClock.REST))
+
+    def update_plan(self):
+        # показываются только ближайшие блоки, план целиком может быть на тысячи задач
+        self.plan_model.clear()
+        planner = self.planner
+        for task_id, first_slot, count, on_time in planner.runs[:50]:
+            task = planner.store.get(task_id)
+            start = planner.slot_start(first_slot)
+            end = planner.finish_time(first_slot, count)
+            text = f"{start:%d.%m %H:%M}–{end:%d.%m %H:%M} · {task.title} ({task.subject}), {count} 🍅"
+            item = QStandardItem(text if on_time else f"⚠ не успеть к {task.deadline_text()}: {text}")
+            if not on_time:
+                item.setForeground(QColor("#D9534F"))
+            item.setData(task_id, Qt.ItemDataRole.UserRole)
+            self.plan_model.appendRow(item)
+
+    def start_session(self, duration):
+        self.clock.start(monotonic_now(), duration)
         self.is_work_session = True
         self.update_circle_icon('work')
         self.motivation_label.setText(random.choice(self.work_quotes))
-        self.timer.start(1000)
+        self.update_timer()
 
     def update_timer(self):
-        self.remaining_time -= 1
-        self.work_time -= 1
-
-        if self.remaining_time <= 0:
-            if self.is_work_session:
+        if not self.clock.running:
+            return
+        now = monotonic_now()
+        finished, session_over = self.clock.advance(now)
+
+        for phase in finished:
+            self.log_phase(phase, self.clock.phase_end(phase), now)
+            if phase % 2 == 0:
                 self.achievements['work_sessions'] += 1
-                self.remaining_time = 5 * 60
-                self.is_work_session = False
-                self.update_circle_icon('rest')
-                self.motivation_label.setText(random.choice(self.break_quotes))
             else:
                 self.achievements['breaks'] += 1
-                self.remaining_time = 25 * 60
-                self.is_work_session = True
-                self.update_circle_icon('work')
-                self.motivation_label.setText(random.choice(self.work_quotes))
-
+        if finished:
             self.work_sessions_label.setText(f"{self.achievements['work_sessions']}")
             self.breaks_label.setText(f"{self.achievements['breaks']}")
 
-        if self.work_time <= 0:
+        if session_over:
+            self.log_phase(self.clock.phase, self.clock.ends, now)  # недоигранная последняя фаза
+            self.clock.stop()
             self.timer.stop()
             self.achievements['completed_sessions'] += 1
             self.completed_sessions_label.setText(f"{self.achievements['completed_sessions']}")
@@ -736,12 +3473,66 @@ class PomodoroTimer(QWidget):
             self.motivation_label.setText("Поздравляем! Вы завершили сессию!")
             self.time_label.setText("Время работы: 0:00\nДо перерыва: 0:00\nВсего осталось: 0:00")
             self.save_achievements()
+            return
 
-        hours_left = int(self.work_time // 3600)
-        minutes_left = int((self.work_time % 3600) // 60)
-        self.time_label.setText(
-            f"Время работы: {hours_left}:{minutes_left:02d}\nДо перерыва: {self.remaining_time // 60}:{self.remaining_time % 60:02d}\nВсего осталось: {hours_left}:{minutes_left:02d}"
-        )
+        if finished:
+            # после сна могло пройти несколько фаз, показываем только текущую
+            self.is_work_session = self.clock.is_work
+            if self.is_work_session:
+                self.update_circle_icon('work')
+                self.motivation_label.setText(random.choice(self.work_quotes))
+            else:
+                self.update_circle_icon('rest')
+                self.motivation_label.setText(random.choice(self.break_quotes))
+
+        if self.is_displayed():
+            work_time = math.ceil(self.clock.ends - now)
+            remaining_time = math.ceil(self.clock.phase_end() - now)
+            hours_left = work_time // 3600
+            minutes_left = (work_time % 3600) // 60
+            self.time_label.setText(
+                f"Время работы: {hours_left}:{minutes_left:02d}\nДо перерыва: {remaining_time // 60}:{remaining_time % 60:02d}\nВсего осталось: {hours_left}:{minutes_left:02d}"
+            )
+        self.schedule_tick(now)
+
+    def log_phase(self, phase, end, now):
+        # в журнал пишется настенное время конца фазы, пересчитанное из монотонных часов
+        duration = end - self.clock.phase_start(phase)
+        if duration > 0:
+            self.db.log_pomodoro_phase(time.time() - (now - end), duration, phase % 2, self.subject_box.currentText().strip())
+
+    def is_displayed(self):
+        return self.isVisible() and not self.window().isMinimized()
+
+    def schedule_tick(self, now):
+        phase_left = self.clock.phase_end() - now
+        if self.is_displayed():
+            # следующая смена секунды на обратном отсчёте
+            delay = phase_left % 1 or 1
+            self.timer.setTimerType(Qt.TimerType.PreciseTimer)
+        else:
+            delay = phase_left
+            self.timer.setTimerType(Qt.TimerType.VeryCoarseTimer)
+        self.timer.start(max(1, math.ceil(delay * 1000)))
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        if self.watched_window is not self.window():
+            self.watched_window = self.window()
+            self.watched_window.installEventFilter(self)
+        if self.planner is not None:
+            self.planner.replanSoon()  # план сдвигается вместе с текущим временем
+        self.update_timer()
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        if self.clock.running:
+            self.schedule_tick(monotonic_now())
+
+    def eventFilter(self, obj, event):
+        if obj is self.watched_window and event.type() == QEvent.Type.WindowStateChange:
+            self.update_timer()  # сворачивание окна: перейти на редкие пробуждения и обратно
+        return super().eventFilter(obj, event)
 
     def confirm_finish_session(self):
         confirm_dialog = QMessageBox(self)
@@ -755,12 +3546,23 @@ class PomodoroTimer(QWidget):
             self.finish_session()
 
     def finish_session(self):
+        self.update_timer()  # засчитать фазы, закончившиеся до нажатия
         self.timer.stop()
+        if self.clock.running:
+            now = monotonic_now()
+            self.log_phase(self.clock.phase, min(now, self.clock.ends), now)
+            self.db.commit()
+        self.clock.stop()
         # Достижения не добавляются при ручном завершении
         self.update_circle_icon('idle.png')
         self.motivation_label.setText("Сессия завершена! Отличная работа!")
         self.time_label.setText("Время работы: 0:00\nДо перерыва: 0:00\nВсего осталось: 0:00")
 
+    def show_statistics(self):
+        self.db.flush()  # последние фазы могли ещё не дойти до базы
+        dialog = PomodoroStatsDialog(pomodoro_statistics(*self.db.load_pomodoro_log()), self)
+        dialog.exec()
+
     def show_help(self):
         help_dialog = QDialog(self)
         help_dialog.setWindowTitle("Помощь")
@@ -790,17 +3592,260 @@ class PomodoroTimer(QWidget):
 
     def load_achievements(self):
         try:
-            with open("achievements.json", "r") as file:
-                self.achievements = json.load(file)
-        except FileNotFoundError:
-            pass
+            self.achievements.update(self.db.load_achievements())
+        except sqlite3.Error as e:
+            print(f"Ошибка при загрузке достижений: {e}")
 
     def save_achievements(self):
-        with open("achievements.json", "w") as file:
-            json.dump(self.achievements, file)
+        try:
+            self.db.save_achievements(self.achievements)
+            self.db.commit()
+        except sqlite3.Error as e:
+            print(f"Ошибка при сохранении достижений: {e}")
+
+def pomodoro_statistics(ended, duration, kind, subject_codes, subjects, now=None):
+    # все агрегаты считаются по столбцам журнала без циклов по записям
+    now = now if now is not None else time.time()
+    utc_offset = datetime.now().astimezone().utcoffset().total_seconds()
+    today = int((now + utc_offset) // 86400)
+    week_start = today - datetime.fromtimestamp(now).weekday()
+
+    work = kind == 0
+    days = ((ended[work] + utc_offset) // 86400).astype(np.int64)
+    focus = duration[work]
+    codes = subject_codes[work]
+
+    last_week = days >= today - 6
+    daily = np.bincount(days[last_week] - (today - 6), weights=focus[last_week], minlength=7)[:7]
+    this_week = days >= week_start
+    by_subject = np.bincount(codes[this_week], weights=focus[this_week], minlength=len(subjects))
+    order = np.argsort(by_subject)[::-1]
+
+    # серии: подряд идущие дни, в которые была хотя бы одна рабочая фаза
+    active_days = np.unique(days)
+    best_streak = current_streak = 0
+    if active_days.size:
+        run_starts = np.flatnonzero(np.diff(active_days, prepend=active_days[0] - 2) != 1)
+        run_lengths = np.diff(np.append(run_starts, active_days.size))
+        best_streak = int(run_lengths.max())
+        if active_days[-1] >= today - 1:
+            current_streak = int(run_lengths[-1])
+
+    month = days >= today - 29
+    return {
+        "today": float(focus[days == today].sum()),
+        "week": float(focus[this_week].sum()),
+        "month_average": float(focus[month].sum()) / 30,
+        "total": float(focus.sum()),
+        "pomodoros": int(np.count_nonzero(work)),
+        "daily": daily.tolist(),
+        "subjects": [(subjects[i] or "Без предмета", float(by_subject[i])) for i in order if by_subject[i] > 0],
+        "current_streak": current_streak,
+        "best_streak": best_streak,
+    }
+
+
+def format_duration(seconds):
+    minutes = int(seconds // 60)
+    return f"{minutes // 60} ч {minutes % 60:02d} мин"
+
+
+class PomodoroStatsDialog(QDialog):
+    DAY_NAMES = ["Пн", "Вт", "Ср", "Чт", "Пт", "Сб", "Вс"]
+
+    def __init__(self, stats, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Статистика")
+        self.setGeometry(100, 100, 400, 400)
+
+        layout = QFormLayout()
+        layout.addRow("Сегодня:", QLabel(format_duration(stats["today"])))
+        layout.addRow("На этой неделе:", QLabel(format_duration(stats["week"])))
+        layout.addRow("В среднем за день (30 дней):", QLabel(format_duration(stats["month_average"])))
+        layout.addRow("Всего:", QLabel(f"{format_duration(stats['total'])}, помидоров: {stats['pomodoros']}"))
+        layout.addRow("Серия дней:", QLabel(f"{stats['current_streak']} (лучшая: {stats['best_streak']})"))
+
+        first_day = datetime.now().weekday() - 6
+        days_text = "\n".join(f"{self.DAY_NAMES[(first_day + i) % 7]}: {format_duration(seconds)}"
+                               for i, seconds in enumerate(stats["daily"]))
+        layout.addRow("Последние 7 дней:", QLabel(days_text))
+        subjects_text = "\n".join(f"{subject}: {format_duration(seconds)}" for subject, seconds in stats["subjects"])
+        layout.addRow("По предметам за неделю:", QLabel(subjects_text or "—"))
+
+        close_button = QPushButton("Закрыть", self)
+        close_button.clicked.connect(self.close)
+        layout.addRow(close_button)
+        self.setLayout(layout)
+
+
+class ThumbnailLoader(QRunnable):
+    def __init__(self, cache, path):
+        super().__init__()
+        self.cache = cache
+        self.path = path
+
+    def run(self):
+        # работает в QThreadPool: только QImage, QPixmap создаётся уже в GUI-потоке
+        images = {}
+        try:
+            stat = os.stat(self.path)
+            missing = []
+            for size in ThumbnailCache.SIZES:
+                image = QImage(self.cache.cachePath(self.path, stat, size))
+                if image.isNull():
+                    missing.append(size)
+                else:
+                    images[size] = image
+
+            if missing:
+                reader = QImageReader(self.path)
+                reader.setAutoTransform(True)
+                largest = max(missing)
+                original = reader.size()
+                if original.isValid() and (original.width() > largest or original.height() > largest):
+                    # JPEG умеет уменьшаться прямо при декодировании
+                    reader.setScaledSize(original.scaled(largest, largest, Qt.AspectRatioMode.KeepAspectRatio))
+                source = reader.read()
+                if not source.isNull():
+                    os.makedirs(self.cache.directory, exist_ok=True)
+                    for size in missing:
+                        image = source.scaled(size, size, Qt.AspectRatioMode.KeepAspectRatio,
+                                              Qt.TransformationMode.SmoothTransformation)
+                        image.save(self.cache.cachePath(self.path, stat, size), "PNG")
+                        images[size] = image
+        except OSError:
+            pass
+        self.cache.loaded.emit(self.path, images)
+
+
+class ThumbnailCache(QObject):
+    # Миниатюры изображений заметок 100x100 (список) и 200x200 (просмотр).
+    # На диске лежат в thumbnails/ под ключом путь+mtime+размер файла, в памяти - LRU.
+    SIZES = (100, 200)
+    MAX_ITEMS = 4000
+
+    loaded = pyqtSignal(str, object)
+    thumbnailReady = pyqtSignal(str)
+
+    def __init__(self, directory="thumbnails", parent=None):
+        super().__init__(parent)
+        self.directory = directory
+        self.pixmaps = OrderedDict()
+        self.pending = set()
+        self.pool = QThreadPool.globalInstance()
+        self.placeholders = {}
+        for size in self.SIZES:
+            placeholder = QPixmap(size, size)
+            placeholder.fill(QColor("#E4E4E2"))
+            self.placeholders[size] = placeholder
+        self.loaded.connect(self.onLoaded)
+
+    def cachePath(self, path, stat, size):
+        key = f"{os.path.abspath(path)}|{stat.st_mtime_ns}|{stat.st_size}|{size}"
+        return os.path.join(self.directory, hashlib.sha1(key.encode('utf-8')).hexdigest() + ".png")
+
+    def get(self, path, size):
+        pixmap = self.pixmaps.get((path, size))
+        if pixmap is not None:
+            self.pixmaps.move_to_end((path, size))
+            return pixmap
+        if path not in self.pending:
+            self.pending.add(path)
+            self.pool.start(ThumbnailLoader(self, path))
+        return self.placeholders[size]
+
+    def invalidate(self, path):
+        for size in self.SIZES:
+            self.pixmaps.pop((path, size), None)
+
+    def onLoaded(self, path, images):
+        self.pending.discard(path)
+        for size in self.SIZES:
+            image = images.get(size)
+            # битый или отсутствующий файл кэшируем пустой картинкой, чтобы не декодировать его снова
+            self.pixmaps[(path, size)] = QPixmap.fromImage(image) if image is not None else QPixmap()
+        while len(self.pixmaps) > self.MAX_ITEMS:
+            self.pixmaps.popitem(last=False)
+        self.thumbnailReady.emit(path)
+
+
+class AssetLoader(QRunnable):
+    def __init__(self, cache, variants):
+        super().__init__()
+        self.cache = cache
+        self.variants = variants
+
+    def run(self):
+        # каждый файл декодируется один раз, из него получаются все нужные размеры
+        images = {}
+        by_path = {}
+        for path, size in self.variants:
+            by_path.setdefault(path, []).append(size)
+        for path, sizes in by_path.items():
+            source = QImage(path)
+            for size in sizes:
+                images[(path, size)] = AssetCache.scaledImage(source, size)
+        self.cache.loaded.emit(images)
+
+
+class AssetCache(QObject):
+    # Общие для всего приложения иконки и картинки интерфейса. Ключ - (путь, размер), size=None - исходный размер.
+    # Повторное обращение возвращает тот же QPixmap, без чтения файла и масштабирования.
+    loaded = pyqtSignal(object)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.pixmaps = {}
+        self.loaded.connect(self.onLoaded)
+
+    @staticmethod
+    def scaledImage(source, size):
+        if source.isNull() or size is None:
+            return source
+        return source.scaled(size, size, Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation)
+
+    def get(self, path, size=None):
+        pixmap = self.pixmaps.get((path, size))
+        if pixmap is None:
+            # ещё не прогрето: декодируем сразу, иконки маленькие
+            pixmap = QPixmap.fromImage(self.scaledImage(QImage(path), size))
+            self.pixmaps[(path, size)] = pixmap
+        return pixmap
+
+    def icon(self, path, size=None):
+        return QIcon(self.get(path, size))
+
+    def warm(self, variants):
+        variants = [variant for variant in variants if variant not in self.pixmaps]
+        if variants:
+            QThreadPool.globalInstance().start(AssetLoader(self, variants))
+
+    def onLoaded(self, images):
+        for key, image in images.items():
+            if key not in self.pixmaps:
+                self.pixmaps[key] = QPixmap.fromImage(image)
+
+
+# Фоновый прогрев - только картинки ленивых страниц. Логотип и иконки боковой панели нужны
+# уже при построении окна, их синхронно декодирует get(), и в фоне они декодировались бы второй раз.
+ASSET_VARIANTS = [
+    ('work_icon.png', 50), ('break_icon.png', 50), ('complete_icon.png', 50),
+    ('work_icon.png', 100), ('break_icon.png', 100), ('complete_icon.png', 100), ('idle_icon.png', 200),
+]
+
+ASSETS = None
+
+
+def get_assets():
+    global ASSETS
+    if ASSETS is None:
+        ASSETS = AssetCache()
+    return ASSETS
+
 
 class Note:
-    def __init__(self, title, subtitle, description, image_path=None, favorite=False, date_created=None):
+    def __init__(self, title, subtitle, description, image_path=None, favorite=False, date_created=None, note_id=None):
+        self.id = note_id  # выдаётся базой при первом сохранении
         self.title = title
         self.subtitle = subtitle
         self.description = description
@@ -810,6 +3855,7 @@ class Note:
 
     def to_dict(self):
         return {
+            "id": self.id,
             "title": self.title,
             "subtitle": self.subtitle,
             "description": self.description,
@@ -826,21 +3872,203 @@ class Note:
             description=data["description"],
             image_path=data.get("image_path"),
             favorite=data.get("favorite", False),
-            date_created=data.get("date_created")
+            date_created=data.get("date_created"),
+            note_id=data.get("id")
         )
 
+class NotesModel(QAbstractListModel):
+    # Конспекты хранятся уже в порядке показа: избранные сверху, внутри группы по id. Прокси с
+    # сортировкой на 20 тысячах строк вызывал data() из C++ на каждое сравнение и тратил секунды на сброс,
+    # а здесь строка на своё место ставится бинарным поиском.
+    NoteRole = Qt.ItemDataRole.UserRole
+
+    def __init__(self, thumbnails, parent=None):
+        super().__init__(parent)
+        self.notes = []
+        self.image_rows = None  # путь картинки -> строки; None - пересобрать при следующей миниатюре
+        self.thumbnails = thumbnails
+        self.thumbnails.thumbnailReady.connect(self.onThumbnailReady)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.notes)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        note = self.notes[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return note.title
+        if role == Qt.ItemDataRole.DecorationRole:
+            return self.thumbnails.get(note.image_path, 100) if note.image_path else None
+        if role == self.NoteRole:
+            return note
+        return None
+
+    @staticmethod
+    def order(note):
+        return (not note.favorite, math.inf if note.id is None else note.id)
+
+    def setNotes(self, notes):
+        self.beginResetModel()
+        self.notes = sorted(notes, key=self.order)  # load_notes отдаёт их уже в этом порядке, сортировка за O(n)
+        self.image_rows = None
+        self.endResetModel()
+
+    def addNote(self, note):
+        row = bisect_right(self.notes, self.order(note), key=self.order)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.notes.insert(row, note)
+        if row < len(self.notes) - 1:
+            self.image_rows = None  # строки ниже сдвинулись
+        elif self.image_rows is not None and note.image_path:
+            self.image_rows.setdefault(note.image_path, []).append(row)
+        self.endInsertRows()
+        return row
+
+    def removeNote(self, row):
+        self.beginRemoveRows(QModelIndex(), row, row)
+        note = self.notes.pop(row)
+        self.image_rows = None  # строки ниже сдвинулись
+        self.endRemoveRows()
+        return note
+
+    def noteChanged(self, row, roles=()):
+        # возвращает новую строку: после смены избранного или id конспект переезжает на своё место
+        if not roles:
+            self.image_rows = None  # картинку могли заменить
+        notes = self.notes
+        key = self.order(notes[row])
+        if row > 0 and key < self.order(notes[row - 1]):
+            target = bisect_right(notes, key, 0, row, key=self.order)
+            self.moveNote(row, target, target)
+            row = target
+        elif row + 1 < len(notes) and self.order(notes[row + 1]) < key:
+            target = bisect_left(notes, key, row + 1, len(notes), key=self.order)
+            self.moveNote(row, target, target - 1)
+            row = target - 1
+        index = self.index(row)
+        self.dataChanged.emit(index, index, list(roles))
+        return row
+
+    def moveNote(self, row, destination, target):
+        self.beginMoveRows(QModelIndex(), row, row, QModelIndex(), destination)
+        self.notes.insert(target, self.notes.pop(row))
+        self.image_rows = None
+        self.endMoveRows()
+
+    def onThumbnailReady(self, path):
+        # сигнал только для строк с этой картинкой; карта строк пересобирается один раз
+        # после изменения списка, а не на каждую миниатюру
+        if self.image_rows is None:
+            self.image_rows = {}
+            for row, note in enumerate(self.notes):
+                if note.image_path:
+                    self.image_rows.setdefault(note.image_path, []).append(row)
+        for row in self.image_rows.get(path, ()):
+            index = self.index(row)
+            self.dataChanged.emit(index, index, [Qt.ItemDataRole.DecorationRole])
+
+
+class NoteDelegate(QStyledItemDelegate):
+    favoriteToggled = pyqtSignal(QModelIndex)
+
+    IMAGE_SIZE = 100
+    STAR_SIZE = 30
+
+    def sizeHint(self, option, index):
+        return QSize(250, self.IMAGE_SIZE + 12)
+
+    def starRect(self, rect):
+        return QRect(rect.right() - self.STAR_SIZE - 10, rect.center().y() - self.STAR_SIZE // 2,
+                     self.STAR_SIZE, self.STAR_SIZE)
+
+    def paint(self, painter, option, index):
+        note = index.data(NotesModel.NoteRole)
+        if note is None:
+            return
+        painter.save()
+        if option.state & QStyle.StateFlag.State_Selected:
+            painter.fillRect(option.rect, option.palette.highlight())
+
+        image_rect = QRect(option.rect.left() + 6, option.rect.top() + 6, self.IMAGE_SIZE, self.IMAGE_SIZE)
+        pixmap = index.data(Qt.ItemDataRole.DecorationRole)
+        if pixmap is not None and not pixmap.isNull():
+            target = pixmap.size().scaled(image_rect.size(), Qt.AspectRatioMode.KeepAspectRatio)
+            painter.drawPixmap(QRect(image_rect.topLeft(), target), pixmap)
+
+        star = self.starRect(option.rect)
+        text_left = image_rect.right() + 12
+        text_width = star.left() - text_left - 6
+        painter.setPen(QColor("#000000"))
+        painter.setFont(QFont("Arial", 12, QFont.Weight.Bold))
+        painter.drawText(QRect(text_left, image_rect.top(), text_width, self.IMAGE_SIZE // 2),
+                         Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignBottom,
+                         painter.fontMetrics().elidedText(note.title, Qt.TextElideMode.ElideRight, text_width))
+        painter.setFont(QFont("Arial", 10))
+        painter.drawText(QRect(text_left, image_rect.center().y() + 4, text_width, self.IMAGE_SIZE // 2),
+                         Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignTop,
+                         painter.fontMetrics().elidedText(note.subtitle, Qt.TextElideMode.ElideRight, text_width))
+
+        painter.setPen(QColor("#C8C8C8"))
+        painter.setBrush(QColor("#F9F9F9"))
+        painter.drawRect(star)
+        painter.setPen(QColor("#000000"))
+        painter.setFont(option.font)
+        painter.drawText(star, Qt.AlignmentFlag.AlignCenter, "★" if note.favorite else "☆")
+        painter.restore()
+
+    def editorEvent(self, event, model, option, index):
+        if (event.type() == QEvent.Type.MouseButtonRelease
+                and event.button() == Qt.MouseButton.LeftButton
+                and self.starRect(option.rect).contains(event.position().toPoint())):
+            self.favoriteToggled.emit(index)
+            return True
+        return super().editorEvent(event, model, option, index)
+
+
 class NotesWidget(QWidget):
-    def __init__(self):
+    def __init__(self, db=None):
         super().__init__()
-        self.notes = []
+        self.db = db or get_database()
+        self.current_image_path = None
+        self.thumbnails = ThumbnailCache(parent=self)
+        self.thumbnails.thumbnailReady.connect(self.on_thumbnail_ready)
+        self.notes_model = NotesModel(self.thumbnails, self)
         self.initUI()
+        self.db.watcher.notesChanged.connect(self.apply_remote_notes)
+        self.db.watcher.resyncNeeded.connect(self.load_notes)
+        self.history = get_history()
+        self.history.register("note", self.apply_history)
+
+    @property
+    def notes(self):
+        return self.notes_model.notes
+
+    @notes.setter
+    def notes(self, notes):
+        self.notes_model.setNotes(notes)
+
+    def select_note(self, note_id):
+        for row, note in enumerate(self.notes):
+            if note.id == note_id:
+                index = self.notes_model.index(row)
+                self.notes_list.setCurrentIndex(index)
+                self.notes_list.scrollTo(index)
+                self.display_note(index)
+                return
 
     def initUI(self):
         try:
             main_layout = QHBoxLayout(self)
 
-            self.notes_list = QListWidget()
-            self.notes_list.itemClicked.connect(self.display_note)
+            self.notes_list = QListView()
+            self.notes_list.setModel(self.notes_model)
+            self.notes_delegate = NoteDelegate(self.notes_list)
+            self.notes_delegate.favoriteToggled.connect(self.toggle_favorite_at)
+            self.notes_list.setItemDelegate(self.notes_delegate)
+            self.notes_list.setUniformItemSizes(True)
+            self.notes_list.setEditTriggers(QListView.EditTrigger.NoEditTriggers)
+            self.notes_list.clicked.connect(self.display_note)
             main_layout.addWidget(self.notes_list)
 
             self.note_detail_widget = QWidget()
@@ -881,40 +4109,64 @@ class NotesWidget(QWidget):
         except Exception as e:
             print(f"Error in NotesWidget.initUI: {e}")
 
+    def current_source_row(self):
+        index = self.notes_list.currentIndex()
+        if not index.isValid():
+            return -1
+        return index.row()
+
     def delete_note(self):
         try:
-            note_index = self.notes_list.currentRow()
+            note_index = self.current_source_row()
             if note_index >= 0 and note_index < len(self.notes):
-                del self.notes[note_index]
-                self.update_notes_list()
+                note = self.notes_model.removeNote(note_index)
                 self.clear_note_details()
-                self.save_notes()
+                if note.id is not None:
+                    self.db.delete_note(note.id)
+                    self.db.commit()
+                    self.history.record("Удаление конспекта", "note", note.id, self.history_fields(note), None)
         except Exception as e:
             print(f"Error in NotesWidget.delete_note: {e}")
 
     def clear_note_details(self):
+        self.current_image_path = None
         self.note_title_subtitle.setText("")
         self.note_description.clear()
         self.note_image.setPixmap(QPixmap())
 
+    def on_thumbnail_ready(self, path):
+        if path == self.current_image_path:
+            self.note_image.setPixmap(self.thumbnails.get(path, 200))
+
     def toggle_favorite(self):
         try:
-            note_index = self.notes_list.currentRow()
+            note_index = self.current_source_row()
             if note_index >= 0 and note_index < len(self.notes):
-                self.notes[note_index].favorite = not self.notes[note_index].favorite
-                self.update_notes_list()
-                self.save_notes()
+                self.set_favorite(note_index, not self.notes[note_index].favorite)
         except Exception as e:
             print(f"Error in NotesWidget.toggle_favorite: {e}")
 
-    def display_note(self, item):
+    def toggle_favorite_at(self, index):
+        row = index.row()
+        self.set_favorite(row, not self.notes[row].favorite)
+
+    def set_favorite(self, row, is_favorite):
+        # переставляется только изменённая строка, остальные не перестраиваются
+        note = self.notes[row]
+        before = self.history_fields(note)
+        note.favorite = is_favorite
+        self.notes_model.noteChanged(row, [NotesModel.NoteRole])
+        self.save_note(note)
+        self.history.record("Избранное", "note", note.id, before, self.history_fields(note))
+
+    def display_note(self, index):
         try:
-            note = self.notes[self.notes_list.row(item)]
+            note = index.data(NotesModel.NoteRole)
             self.note_title_subtitle.setText(f"{note.title}\n{note.subtitle}")
             self.note_description.setPlainText(note.description)
+            self.current_image_path = note.image_path
             if note.image_path:
-                pixmap = QPixmap(note.image_path)
-                self.note_image.setPixmap(pixmap.scaled(200, 200, Qt.AspectRatioMode.KeepAspectRatio))
+                self.note_image.setPixmap(self.thumbnails.get(note.image_path, 200))
             else:
                 self.note_image.setPixmap(QPixmap())
         except Exception as e:
@@ -922,70 +4174,17 @@ class NotesWidget(QWidget):
 
     def edit_note(self):
         try:
-            note_index = self.notes_list.currentRow()
+            note_index = self.current_source_row()
             if note_index >= 0 and note_index < len(self.notes):
                 note = self.notes[note_index]
                 self.note_title_subtitle.setText(f"Edit: {note.title}")
-                self.edit_note_dialog(note)
+                self.edit_note_dialog(note, note_index)
         except Exception as e:
             print(f"Ошибка: {e}")
 
-    def add_note_to_list(self, note, index=None):
-        try:
-            item = QListWidgetItem()
-            item.setSizeHint(QSize(400, 100))
-
-            widget_item = QWidget()
-            layout = QHBoxLayout(widget_item)
-
-            image_label = QLabel()
-            if note.image_path:
-                pixmap = QPixmap(note.image_path)
-                image_label.setPixmap(pixmap.scaled(100, 100, Qt.AspectRatioMode.KeepAspectRatio))
-            else:
-                image_label.setPixmap(
-                    QPixmap("/mnt/data/image.png").scaled(100, 100, Qt.AspectRatioMode.KeepAspectRatio))
-            image_label.setFixedSize(100, 100)
-            layout.addWidget(image_label)
-
-            text_layout = QVBoxLayout()
-            title_label = QLabel(note.title)
-            subtitle_label = QLabel(note.subtitle)
-            title_label.setFont(QFont("Arial", 12, QFont.Weight.Bold))
-            subtitle_label.setFont(QFont("Arial", 10))
-            text_layout.addWidget(title_label)
-            text_layout.addWidget(subtitle_label)
-
-            layout.addLayout(text_layout)
-
-            favorite_button = QPushButton("☆" if not note.favorite else "★")
-            favorite_button.setCheckable(True)
-            favorite_button.setChecked(note.favorite)
-            favorite_button.clicked.connect(lambda checked, n=note: self.toggle_favorite_from_button(n, checked))
-            layout.addWidget(favorite_button)
-
-            widget_item.setLayout(layout)
-            item.setSizeHint(widget_item.sizeHint())
-
-            if index is not None:
-                self.notes_list.insertItem(index, item)
-            else:
-                self.notes_list.addItem(item)
-            self.notes_list.setItemWidget(item, widget_item)
-        except Exception as e:
-            print(f"Error in NotesWidget.add_note_to_list: {e}")
-
-    def toggle_favorite_from_button(self, note, is_favorite):
-        note.favorite = is_favorite
-        self.update_notes_list()
-        self.save_notes()
-
     def update_notes_list(self):
         try:
-            self.notes_list.clear()
-            self.notes.sort(key=lambda x: not x.favorite)
-            for note in self.notes:
-                self.add_note_to_list(note)
+            self.notes = list(self.notes)
         except Exception as e:
             print(f"Error in NotesWidget.update_notes_list: {e}")
 
@@ -996,40 +4195,105 @@ class NotesWidget(QWidget):
                 subtitle="Введите подзаголовок",
                 description="Введите описание"
             )
-            self.notes.append(new_note)
-            self.update_notes_list()
-            self.edit_note_dialog(new_note)
+            self.edit_note_dialog(new_note, self.notes_model.addNote(new_note))
         except Exception as e:
             print(f"Error in NotesWidget.add_note: {e}")
 
-    def edit_note_dialog(self, note):
+    def edit_note_dialog(self, note, row):
         try:
+            before = self.history_fields(note) if note.id is not None else None
             dialog = NoteEditDialog(note, self)
-            dialog.exec()
-            self.update_notes_list()
-            self.save_notes()
+            if dialog.exec() and note.image_path:
+                self.thumbnails.invalidate(note.image_path)  # файл могли заменить, ключ на диске это учтёт
+            self.save_note(note)  # новый конспект получает id, по нему строка встаёт на место
+            self.notes_model.noteChanged(row)
+            self.history.record("Изменение конспекта" if before else "Новый конспект", "note", note.id,
+                                before, self.history_fields(note))
         except Exception as e:
             print(f"Error in NotesWidget.edit_note_dialog: {e}")
 
+    def save_note(self, note):
+        # в базе переписывается одна строка, а не весь список конспектов
+        try:
+            self.db.save_note(note)
+            self.db.commit()
+        except Exception as e:
+            print(f"Error in NotesWidget.save_note: {e}")
+
     def save_notes(self):
         try:
-            notes_data = [note.to_dict() for note in self.notes]
-            with open("notes.json", "w", encoding="utf-8") as f:
-                json.dump(notes_data, f, ensure_ascii=False, indent=4)
+            for note in self.notes:
+                self.db.save_note(note)
+            self.db.commit()
         except Exception as e:
             print(f"Error in NotesWidget.save_notes: {e}")
 
     def load_notes(self):
         try:
-            with open("notes.json", "r", encoding="utf-8") as f:
-                notes_data = json.load(f)
-                self.notes = [Note.from_dict(note) for note in notes_data]
-                self.update_notes_list()
-        except FileNotFoundError:
-            self.notes = []
+            self.notes = [Note.from_dict(note) for note in self.db.load_notes()]
         except Exception as e:
             print(f"Error in NotesWidget.load_notes: {e}")
 
+    @staticmethod
+    def history_fields(note):
+        data = note.to_dict()
+        del data["id"]
+        return data
+
+    def apply_history(self, note_id, fields):
+        # шаг отмены/повтора; удалённый конспект восстанавливается по полному снимку с прежним id
+        try:
+            row = next((row for row, note in enumerate(self.notes) if note.id == note_id), None)
+            if fields is None:
+                if row is not None:
+                    self.notes_model.removeNote(row)
+                    self.clear_note_details()
+                    self.db.delete_note(note_id)
+                    self.db.commit()
+            elif row is not None:
+                note = self.notes[row]
+                for name, value in fields.items():
+                    setattr(note, name, value)
+                self.notes_model.noteChanged(row)
+                self.save_note(note)
+            elif "title" in fields and "description" in fields:
+                note = Note.from_dict(dict(fields, id=note_id))
+                self.notes_model.addNote(note)
+                self.save_note(note)
+        except Exception as e:
+            print(f"Error in NotesWidget.apply_history: {e}")
+
+    def apply_remote_notes(self, note_ids):
+        # конспекты, изменённые другой копией органайзера: меняются только затронутые строки
+        try:
+            notes = self.db.load_notes_by_id(note_ids)
+            rows = None  # id -> строка; пересобирается, только если строки сдвинулись
+            removed = False
+            for note_id in note_ids:
+                if rows is None:
+                    rows = {note.id: row for row, note in enumerate(self.notes)}
+                note = notes.get(note_id)
+                row = rows.get(note_id)
+                if note is None:
+                    if row is not None:
+                        self.notes_model.removeNote(row)
+                        rows = None
+                        removed = True
+                elif row is None:
+                    row = self.notes_model.addNote(note)
+                    if row == len(self.notes) - 1:
+                        rows[note_id] = row
+                    else:
+                        rows = None
+                else:
+                    self.notes[row] = note
+                    if self.notes_model.noteChanged(row) != row:
+                        rows = None
+            if removed:
+                self.clear_note_details()
+        except Exception as e:
+            print(f"Error in NotesWidget.apply_remote_notes: {e}")
+
 
 class NoteEditDialog(QDialog):
     def __init__(self, note, parent=None):
@@ -1173,6 +4437,49 @@ class CustomTitleBar(QWidget):
     def mouseReleaseEvent(self, event):
         self.pressing = False
 
+class SearchBox(QLineEdit):
+    resultActivated = pyqtSignal(object)
+
+    KIND_TITLES = {"task": "Задача", "note": "Конспект", "day": "Календарь"}
+    SEARCH_DELAY = 80  # мс без нажатий до запроса
+
+    def __init__(self, db, parent=None):
+        super().__init__(parent)
+        self.db = db
+        self.setPlaceholderText("Поиск...")
+        self.setFixedWidth(260)
+        self.setStyleSheet("background-color: #FFFFFF; border-radius: 5px; padding: 3px;")
+
+        self.results = QStandardItemModel(self)
+        self.completer = QCompleter(self.results, self)
+        self.completer.setCompletionMode(QCompleter.CompletionMode.UnfilteredPopupCompletion)
+        self.completer.setWidget(self)
+        self.completer.activated[QModelIndex].connect(self.onActivated)
+        # запрос уходит в поток поиска после паузы в наборе, GUI-поток его не ждёт
+        self.delay = QTimer(self)
+        self.delay.setSingleShot(True)
+        self.delay.setInterval(self.SEARCH_DELAY)
+        self.delay.timeout.connect(lambda: self.db.search_async(self.text()))
+        self.textEdited.connect(lambda text: self.delay.start())
+        self.db.searchFinished.connect(self.showResults)
+
+    def showResults(self, text, results):
+        if text != self.text():
+            return  # ответ на устаревший запрос
+        self.results.clear()
+        for key, title, subtitle, score in results:
+            item = QStandardItem(f"{self.KIND_TITLES[key[0]]}: {title}" + (f" — {subtitle}" if subtitle else ""))
+            item.setData(key, Qt.ItemDataRole.UserRole)
+            self.results.appendRow(item)
+        if self.results.rowCount():
+            self.completer.complete()
+        else:
+            self.completer.popup().hide()
+
+    def onActivated(self, index):
+        self.resultActivated.emit(index.data(Qt.ItemDataRole.UserRole))
+
+
 class MainWindow(QMainWindow):
     def __init__(self):
         try:
@@ -1189,6 +4496,12 @@ class MainWindow(QMainWindow):
             self.title_bar = CustomTitleBar(self)
             main_layout.addWidget(self.title_bar)
 
+            self.db = get_database()
+            get_assets().warm(ASSET_VARIANTS)  # картинки помодоро декодируются в фоне, пока строится окно
+            self.search_box = SearchBox(self.db)
+            self.search_box.resultActivated.connect(self.openSearchResult)
+            self.title_bar.layout().insertWidget(2, self.search_box)
+
             content_layout = QHBoxLayout()
             main_layout.addLayout(content_layout)
 
@@ -1204,29 +4517,167 @@ class MainWindow(QMainWindow):
             self.side_panel.buttonClicked.connect(self.changePage)
             content_layout.addWidget(self.side_panel)
 
+            # страницы создаются при первом открытии, чтобы первый кадр не зависел от объёма данных
             self.stack = QStackedWidget()
-            self.pages = {
-                'Главная': QWidget(),
-                '   Цели': Deadlines(),
-                'Конспекты': NotesWidget(),
-                'Календарь': CalendarWidget(),
-                'Помодоро': PomodoroTimer()
+            self.page_factories = {
+                'Главная': QWidget,
+                '   Цели': self.createDeadlines,
+                'Конспекты': lambda: NotesWidget(self.db),
+                'Календарь': lambda: CalendarWidget(self.db),
+                'Помодоро': lambda: PomodoroTimer(self.page('   Цели').planner)
             }
-            for page in self.pages.values():
-                self.stack.addWidget(page)
+            self.pages = {}
+            self.prewarm_queue = []
 
             content_layout.addWidget(self.stack)
-            self.changePage('home')
+            self.changePage('Главная')
+
+            self.history = get_history()
+            self.undo_action = QAction('Отменить', self)
+            self.undo_action.setShortcut(QKeySequence.StandardKey.Undo)
+            self.undo_action.triggered.connect(self.undo)
+            self.redo_action = QAction('Повторить', self)
+            self.redo_action.setShortcut(QKeySequence.StandardKey.Redo)
+            self.redo_action.triggered.connect(self.redo)
+            self.addActions([self.undo_action, self.redo_action])
+            self.history.historyChanged.connect(self.updateHistoryActions)
+            self.updateHistoryActions()
+
+            # напоминания о сроках приходят уведомлениями в системном трее, без трея - окном сообщения
+            self.tray = QSystemTrayIcon(get_assets().icon(logo_path, 50), self)
+            self.tray.setToolTip('Study Organizer')
+            self.tray.activated.connect(self.showFromTray)
+            self.tray.messageClicked.connect(self.openReminder)
+            self.reminded_task = None
+            self.reminder_box = None
+            if QSystemTrayIcon.isSystemTrayAvailable():
+                self.tray.show()
         except Exception as e:
             print(f"Error in MainWindow.__init__: {e}")
 
+    def createDeadlines(self):
+        page = Deadlines(self.db)
+        page.remindersDue.connect(self.showReminders)
+        return page
+
+    def showReminders(self, reminders):
+        try:
+            deadlines = self.page('   Цели')
+            now = datetime.now()
+            tasks = [deadlines.store.get(task_id) for task_id, minutes in reminders]
+            tasks.sort(key=lambda task: task.deadline)
+            first = tasks[0]
+            if len(tasks) == 1:
+                title = f"Через {format_duration((first.deadline - now).total_seconds())}: {first.title}"
+                message = f"{first.subject}, срок {first.deadline_text()}"
+            else:
+                title = f"Скоро сроки у задач: {len(tasks)}"
+                message = "\n".join(f"{task.deadline_text()} {task.title}" for task in tasks[:5])
+            self.reminded_task = first.id
+            if self.tray.isVisible() and QSystemTrayIcon.supportsMessages():
+                self.tray.showMessage(title, message, QSystemTrayIcon.MessageIcon.Information)
+            else:
+                self.showReminderBox(title, message)
+        except Exception as e:
+            print(f"Error in MainWindow.showReminders: {e}")
+
+    def showReminderBox(self, title, message):
+        # одно немодальное окно на все напоминания: новое заменяет текст, а не открывает ещё одно
+        if self.reminder_box is None:
+            self.reminder_box = QMessageBox(QMessageBox.Icon.Information, 'Напоминание', '',
+                                            QMessageBox.StandardButton.Close, self)
+            self.reminder_box.setModal(False)
+            open_button = self.reminder_box.addButton('Открыть задачу', QMessageBox.ButtonRole.AcceptRole)
+            self.reminder_box.buttonClicked.connect(
+                lambda button: self.openReminder() if button is open_button else None)
+        self.reminder_box.setText(title)
+        self.reminder_box.setInformativeText(message)
+        self.reminder_box.show()
+
+    def showFromTray(self, reason=None):
+        self.showNormal()
+        self.raise_()
+        self.activateWindow()
+
+    def openReminder(self):
+        self.showFromTray()
+        if self.reminded_task is not None:
+            self.openSearchResult(("task", self.reminded_task))
+
+    HISTORY_PAGES = {"task": '   Цели', "note": 'Конспекты'}
+
+    def updateHistoryActions(self):
+        undo_label, redo_label = self.history.undo_label(), self.history.redo_label()
+        self.undo_action.setEnabled(undo_label is not None)
+        self.undo_action.setToolTip(f"Отменить: {undo_label}" if undo_label else "Отменить")
+        self.redo_action.setEnabled(redo_label is not None)
+        self.redo_action.setToolTip(f"Повторить: {redo_label}" if redo_label else "Повторить")
+
+    def undo(self):
+        self.stepHistory(self.history.undo)
+
+    def redo(self):
+        self.stepHistory(self.history.redo)
+
+    def stepHistory(self, step):
+        # шаги из прошлого запуска могут относиться к ещё не созданной странице
+        try:
+            for name in self.HISTORY_PAGES.values():
+                self.page(name)
+            kind = step()
+            if kind in self.HISTORY_PAGES:
+                self.changePage(self.HISTORY_PAGES[kind])
+        except Exception as e:
+            print(f"Error in MainWindow.stepHistory: {e}")
+
+    def page(self, page_name):
+        page = self.pages.get(page_name)
+        if page is None:
+            page = self.page_factories[page_name]()
+            self.pages[page_name] = page
+            self.stack.addWidget(page)
+        return page
+
     def changePage(self, page_name):
         try:
-            self.stack.setCurrentWidget(self.pages[page_name])
+            self.stack.setCurrentWidget(self.page(page_name))
             self.side_panel.setActiveButton(page_name)
         except Exception as e:
             print(f"Error in MainWindow.changePage: {e}")
 
+    def showEvent(self, event):
+        super().showEvent(event)
+        if not self.prewarm_queue and len(self.pages) < len(self.page_factories):
+            # после первого кадра остальные страницы строятся по одной, между ними обрабатывается ввод;
+            # заодно запускается таймер дедлайнов
+            self.prewarm_queue = [name for name in self.page_factories if name not in self.pages]
+            QTimer.singleShot(0, self.prewarmNextPage)
+
+    def prewarmNextPage(self):
+        if self.prewarm_queue:
+            self.page(self.prewarm_queue.pop(0))
+        if self.prewarm_queue:
+            QTimer.singleShot(0, self.prewarmNextPage)
+
+    def closeEvent(self, event):
+        self.db.flush()
+        super().closeEvent(event)
+
+    def openSearchResult(self, key):
+        try:
+            kind, value = key
+            if kind == "task":
+                self.changePage('   Цели')
+                self.page('   Цели').selectTask(value)
+            elif kind == "note":
+                self.changePage('Конспекты')
+                self.page('Конспекты').select_note(value)
+            elif kind == "day":
+                self.changePage('Календарь')
+                self.page('Календарь').select_date(value)
+        except Exception as e:
+            print(f"Error in MainWindow.openSearchResult: {e}")
+
     def mousePressEvent(self, event):
         try:
             if event.button() == Qt.MouseButton.LeftButton:
@@ -1263,16 +4714,15 @@ class SidePanel(QWidget):
             layout = QVBoxLayout()
             self.setLayout(layout)
 
-            pixmap = QPixmap(self.logo_path)
             logo_label = QLabel()
-            logo_label.setPixmap(pixmap.scaled(QSize(50, 50), Qt.AspectRatioMode.KeepAspectRatio))
+            logo_label.setPixmap(get_assets().get(self.logo_path, 50))
             logo_label.setStyleSheet("background-color: transparent;")
             layout.addWidget(logo_label, alignment=Qt.AlignmentFlag.AlignCenter)
 
             self.buttons = {}
             for name, icon_path in self.icons.items():
                 btn = QPushButton()
-                btn.setIcon(QIcon(icon_path))
+                btn.setIcon(get_assets().icon(icon_path))
                 btn.setIconSize(QSize(24, 24))
                 btn.setToolTip(name.capitalize())
                 btn.setStyleSheet("border: none; background-color: #E4E4E2;")  # Updated
@@ -1325,9 +4775,146 @@ class SidePanel(QWidget):
         except Exception as e:
             print(f"Error in SidePanel.leaveEvent: {e}")
 
+class Tracer:
+    # Записывает интервалы выполнения в формате Chrome trace (chrome://tracing, Perfetto).
+    # Хранятся последние MAX_EVENTS событий, так что долгая сессия не растит память.
+    MAX_EVENTS = 200000
+    MAX_GUI_SPANS = 10000
+
+    def __init__(self):
+        self.events = deque(maxlen=self.MAX_EVENTS)
+        # интервалы GUI-потока отдельно: только они могут задержать цикл событий. Поток один,
+        # поэтому порядок добавления совпадает с порядком окончания интервалов
+        self.gui_spans = deque(maxlen=self.MAX_GUI_SPANS)
+        self.gui_thread = threading.get_ident()
+        self.origin = time.perf_counter_ns()
+        self.pid = os.getpid()
+
+    def now(self):
+        return (time.perf_counter_ns() - self.origin) // 1000  # микросекунды
+
+    def add(self, name, start, duration, category="span", args=None):
+        event = {"name": name, "cat": category, "ph": "X", "ts": start, "dur": duration,
+                 "pid": self.pid, "tid": threading.get_ident()}
+        if args:
+            event["args"] = args
+        self.events.append(event)  # deque.append атомарен, вызывается и из фоновых потоков
+        if category == "span" and event["tid"] == self.gui_thread:
+            self.gui_spans.append(event)
+
+    def traced(self, name, function):
+        # слоты Qt вызываются с лишними аргументами сигнала, поэтому передаём не больше, чем принимает функция
+        parameters = inspect.signature(function).parameters.values()
+        if any(parameter.kind == parameter.VAR_POSITIONAL for parameter in parameters):
+            max_args = None
+        else:
+            max_args = sum(parameter.kind in (parameter.POSITIONAL_ONLY, parameter.POSITIONAL_OR_KEYWORD)
+                           for parameter in parameters)
+
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            if max_args is not None:
+                args = args[:max_args]
+            start = self.now()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.add(name, start, self.now() - start)
+        return wrapper
+
+    def spans_between(self, start, end):
+        # интервалы GUI-потока, пересекающие [start, end); просмотр с конца останавливается
+        # на первом интервале, закончившемся до start, поэтому стоит O(интервалов в окне)
+        spans = []
+        for event in reversed(self.gui_spans):
+            if event["ts"] + event["dur"] <= start:
+                break
+            if event["ts"] < end:
+                spans.append(event)
+        return spans
+
+    def dump(self, path):
+        try:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump({"traceEvents": list(self.events), "displayTimeUnit": "ms"}, f)
+            print(f"Трассировка сохранена в {path}")
+        except OSError as e:
+            print(f"Ошибка при сохранении трассировки: {e}")
+
+
+class EventLoopMonitor(QObject):
+    # Пульс раз в INTERVAL мс: если таймер сработал заметно позже, цикл событий был занят.
+    # Задержка пишется в трассировку вместе с самым долгим интервалом, попавшим на это время.
+    INTERVAL = 50
+    THRESHOLD = 30
+
+    def __init__(self, tracer, parent=None):
+        super().__init__(parent)
+        self.tracer = tracer
+        self.expected = None
+        self.timer = QTimer(self)
+        self.timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self.timer.timeout.connect(self.beat)
+
+    def start(self):
+        self.expected = self.tracer.now() + self.INTERVAL * 1000
+        self.timer.start(self.INTERVAL)
+
+    def beat(self):
+        now = self.tracer.now()
+        lag = now - self.expected
+        if lag > self.THRESHOLD * 1000:
+            spans = self.tracer.spans_between(self.expected, now)
+            culprit = max(spans, key=lambda event: event["dur"])["name"] if spans else "неизвестно"
+            self.tracer.add("event loop lag", self.expected, lag, "lag", {"lag_ms": lag / 1000, "culprit": culprit})
+        self.expected = now + self.INTERVAL * 1000
+
+
+TRACED_METHODS = [
+    ("Deadlines.saveTasks", lambda: Deadlines, "saveTasks"),
+    ("Deadlines.checkDeadlines", lambda: Deadlines, "checkDeadlines"),
+    ("Deadlines.loadTasks", lambda: Deadlines, "loadTasks"),
+    ("NotesWidget.update_notes_list", lambda: NotesWidget, "update_notes_list"),
+    ("NotesWidget.display_note", lambda: NotesWidget, "display_note"),
+    ("NotesWidget.load_notes", lambda: NotesWidget, "load_notes"),
+    ("CalendarWidget.load_notes_from_json", lambda: CalendarWidget, "load_notes_from_json"),
+    ("CalendarWidget.save_notes_to_json", lambda: CalendarWidget, "save_notes_to_json"),
+    ("PomodoroTimer.update_timer", lambda: PomodoroTimer, "update_timer"),
+    ("MainWindow.page", lambda: MainWindow, "page"),
+    ("ThumbnailLoader.run", lambda: ThumbnailLoader, "run"),
+    ("AssetLoader.run", lambda: AssetLoader, "run"),
+    ("OrganizerDatabase.search", lambda: OrganizerDatabase, "search"),
+    ("OrganizerDatabase.flush", lambda: OrganizerDatabase, "flush"),
+]
+
+
+def enable_tracing(app, path):
+    # Включается переменной окружения STUDY_ORGANIZER_TRACE=файл.json. Обёртки ставятся на классы
+    # до создания окна, поэтому без трассировки горячие пути ничего не платят.
+    tracer = Tracer()
+    for name, owner, attribute in TRACED_METHODS:
+        cls = owner()
+        setattr(cls, attribute, tracer.traced(name, getattr(cls, attribute)))
+    monitor = EventLoopMonitor(tracer, app)
+    monitor.start()
+    app.aboutToQuit.connect(lambda: tracer.dump(path))
+    return tracer
+
+
+def report_exception(kind, error, trace):
+    # PyQt6 завершает процесс при исключении в слоте, если excepthook стандартный; здесь действие
+    # просто не выполняется, а о занятой базе пользователь узнаёт сообщением
+    sys.__excepthook__(kind, error, trace)
+    if database_busy(error):
+        QMessageBox.warning(None, "Ошибка", "База занята другой копией органайзера. Повторите действие позже.")
+
+
 if __name__ == '__main__':
+    sys.excepthook = report_exception
     try:
         app = QApplication(sys.argv)
+        if os.environ.get("STUDY_ORGANIZER_TRACE"):
+            enable_tracing(app, os.environ["STUDY_ORGANIZER_TRACE"])
         window = MainWindow()
         window.show()
         window.resize(1000, 800)
@@ -0,0 +1,246 @@
+import os
+import random
+import shutil
+import tempfile
+import unittest
+from collections import Counter
+from datetime import datetime, timedelta
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt6.QtWidgets import QApplication
+
+import main
+
+# Проверки доски задач на временной базе: python -m pytest test_deadlines.py
+
+APP = QApplication.instance() or QApplication([])
+
+
+class DeadlinesTestCase(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.directory = tempfile.mkdtemp(prefix="organizer-test-")
+        os.chdir(self.directory)
+        self.deadlines = main.Deadlines()
+        self.db = self.deadlines.db
+
+    def tearDown(self):
+        self.deadlines.archiveWindow.close()
+        self.deadlines.close()
+        self.db.flush()
+        self.db.close()
+        APP.processEvents()
+        self.db.conn.close()
+        main.DATABASE = None
+        main.DAY_INDEX = None
+        main.HISTORY = None
+        os.chdir(self.cwd)
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def archived_deadlines(self):
+        self.db.flush()
+        return sorted(task.deadline for seq, task in self.db.archive_page(0, 100))
+
+    def test_series_with_passed_last_occurrence(self):
+        # серия из трёх еженедельных сроков, все три уже прошли
+        first = (datetime.now() - timedelta(days=15)).replace(second=0, microsecond=0)
+        task = self.deadlines.store.add("Лабораторная", first, "отчёт", "Физика", recurrence=main.Recurrence(7, 3))
+        self.deadlines.checkDeadlines()
+
+        self.assertIsNone(self.deadlines.store.get(task.id))
+        self.assertEqual(self.archived_deadlines(), [first + timedelta(days=7 * i) for i in range(3)])
+
+    def test_series_advances_to_next_occurrence(self):
+        first = (datetime.now() - timedelta(days=8)).replace(second=0, microsecond=0)
+        task = self.deadlines.store.add("Лабораторная", first, "отчёт", "Физика", recurrence=main.Recurrence(7, 3))
+        self.deadlines.checkDeadlines()
+
+        self.assertEqual(self.deadlines.store.get(task.id).deadline, first + timedelta(days=14))
+        self.assertEqual(self.deadlines.store.get(task.id).recurrence, main.Recurrence(7, 1))
+        self.assertEqual(self.archived_deadlines(), [first, first + timedelta(days=7)])
+
+    def test_calendar_note_round_trip(self):
+        text = "Контрольная\nпринести калькулятор\nкаб. 204"
+        path = os.path.join(self.directory, "export.ics")
+        main.write_ics(path, [], [("2030-10-10", text)])
+        self.deadlines.importCalendar(path)
+        self.db.flush()
+        self.assertEqual(self.db.load_calendar_notes(["2030-10-10"]), {"2030-10-10": text})
+
+        self.deadlines.importCalendar(path)  # повторный импорт не дублирует строки
+        self.db.flush()
+        self.assertEqual(self.db.load_calendar_notes(["2030-10-10"]), {"2030-10-10": text})
+
+    def test_board_follows_store_changes(self):
+        # после каждой правки колонки доски совпадают с перебором всех задач под текущими фильтрами
+        rng = random.Random(3)
+        now = datetime.now()
+        subjects = ["Алгебра", "Физика", "История"]
+        store = self.deadlines.store
+        store.add_many([(f"Задача {i}", now + timedelta(hours=rng.randint(1, 2000)), "", rng.choice(subjects),
+                         rng.choice(["tasks", "in_progress"]), 1, None) for i in range(2000)])
+
+        def check():
+            for column, (title, view) in self.deadlines.boardColumns.items():
+                model = view.model()
+                expected = [task.id for task in store.column(column)
+                            if store.index.matches(task, model.subject, model.start, model.end)]
+                if model.sort == model.SORT_DEADLINE:
+                    expected.sort(key=lambda task_id: main.TaskIndex.key(store.get(task_id)))
+                self.assertEqual(model.ids, expected)
+
+        check()
+        ids = list(store.tasks)
+        for step in range(300):
+            task = store.get(rng.choice(ids))
+            action = rng.random()
+            if task is None:
+                continue
+            if action < 0.3:
+                store.move(task.id, "in_progress" if task.column == "tasks" else "tasks")
+            elif action < 0.5:
+                store.update(task.id, deadline=now + timedelta(hours=rng.randint(1, 2000)))
+            elif action < 0.6:
+                store.update(task.id, subject=rng.choice(subjects + ["Химия"]))
+            elif action < 0.7:
+                store.remove(task.id)
+            else:
+                ids.append(store.add("Новая", now + timedelta(hours=5), "", rng.choice(subjects),
+                                     rng.choice(["tasks", "in_progress"])).id)
+            if step % 50 == 0:
+                self.deadlines.subjectFilter.setCurrentIndex(rng.randrange(self.deadlines.subjectFilter.count()))
+                self.deadlines.periodFilter.setCurrentIndex(rng.randrange(self.deadlines.periodFilter.count()))
+                self.deadlines.sortOrder.setCurrentIndex(rng.randrange(self.deadlines.sortOrder.count()))
+            check()
+
+    def test_day_markers_match_occurrences(self):
+        # число сроков в ячейке календаря против прямого перебора повторов каждой задачи на 600 дней
+        rng = random.Random(5)
+        now = datetime.now().replace(second=0, microsecond=0)
+        tasks = []
+        for i in range(500):
+            recurrence = rng.choice([None, main.Recurrence(rng.choice([1, 3, 7, 14]), rng.choice([None, 5, 20]),
+                                                           rng.choice([None, now + timedelta(days=rng.randint(0, 300))]))])
+            tasks.append(main.Task(i, "Задача", now + timedelta(days=rng.randint(-100, 100)), "", "Физика",
+                                   recurrence=recurrence))
+        day_index = main.get_day_index()
+        day_index.reset_tasks(tasks)
+
+        start, end = now - timedelta(days=200), now + timedelta(days=400)
+        expected = Counter()
+        for task in tasks:
+            moments = task.recurrence.occurrences(task.deadline, start, end) if task.recurrence else [task.deadline]
+            expected.update(main.DayIndex.julian(moment) for moment in moments)
+        base = main.DayIndex.julian(now)
+        for day in range(base - 200, base + 400):
+            self.assertEqual(day_index.markers(day)[1], expected[day], day)
+
+
+class RecurrenceTestCase(unittest.TestCase):
+    start = datetime(2030, 9, 2, 10, 0)
+
+    def test_parse_and_rule(self):
+        recurrence = main.Recurrence.parse("FREQ=WEEKLY;INTERVAL=2;COUNT=3")
+        self.assertEqual(recurrence, main.Recurrence(14, 3))
+        self.assertEqual(main.Recurrence.parse(recurrence.rule()), recurrence)
+        until = main.Recurrence.parse("FREQ=DAILY;UNTIL=20301010T000000")
+        self.assertEqual(until, main.Recurrence(1, None, datetime(2030, 10, 10)))
+        self.assertEqual(main.Recurrence.parse(until.rule()), until)
+
+    def test_parse_rejects_unsupported_and_invalid(self):
+        for text in ["FREQ=WEEKLY;BYDAY=MO,WE", "FREQ=MONTHLY", "FREQ=DAILY;COUNT=0", "FREQ=DAILY;COUNT=-1",
+                     "FREQ=DAILY;UNTIL=завтра", "FREQ=WEEKLY;INTERVAL=0", "INTERVAL=2", ""]:
+            self.assertIsNone(main.Recurrence.parse(text), text)
+
+    def test_next_counts_down_to_end(self):
+        recurrence = main.Recurrence(7, 3)
+        deadlines = [self.start]
+        step = recurrence.next(self.start)
+        while step is not None:
+            deadlines.append(step[0])
+            step = step[1].next(step[0])
+        self.assertEqual(deadlines, [self.start + timedelta(days=7 * i) for i in range(3)])
+
+    def test_next_stops_at_until(self):
+        recurrence = main.Recurrence(1, None, self.start + timedelta(days=2, hours=1))
+        following, rest = recurrence.next(self.start)
+        self.assertEqual(following, self.start + timedelta(days=1))
+        self.assertEqual(rest.next(following)[0], self.start + timedelta(days=2))
+        self.assertIsNone(rest.next(self.start + timedelta(days=2)))
+
+    def test_last(self):
+        self.assertEqual(main.Recurrence(7, 3).last(self.start), self.start + timedelta(days=14))
+        self.assertEqual(main.Recurrence(7, None, self.start + timedelta(days=20)).last(self.start),
+                         self.start + timedelta(days=14))
+        self.assertEqual(main.Recurrence(1, 10, self.start + timedelta(days=3)).last(self.start),
+                         self.start + timedelta(days=3))
+        self.assertEqual(main.Recurrence(1, None, self.start - timedelta(days=1)).last(self.start), self.start)
+        self.assertIsNone(main.Recurrence(7).last(self.start))
+
+    def test_occurrences_match_stepping(self):
+        rng = random.Random(7)
+        for _ in range(200):
+            recurrence = main.Recurrence(rng.choice([1, 2, 7, 14]), rng.choice([None, 1, 4, 30]),
+                                         rng.choice([None, self.start + timedelta(days=rng.randint(0, 120))]))
+            window_start = self.start + timedelta(days=rng.randint(-30, 90), hours=rng.randint(0, 23))
+            window_end = window_start + timedelta(days=rng.randint(0, 60))
+            expected = []
+            deadline, rule = self.start, recurrence
+            while deadline < window_end:
+                if deadline >= window_start:
+                    expected.append(deadline)
+                step = rule.next(deadline)
+                if step is None:
+                    break
+                deadline, rule = step
+            self.assertEqual(list(recurrence.occurrences(self.start, window_start, window_end)), expected)
+
+
+class IcsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix="organizer-ics-")
+        self.path = os.path.join(self.directory, "calendar.ics")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def read(self):
+        return list(main.read_ics(self.path))
+
+    def test_task_round_trip(self):
+        deadline = datetime(2030, 9, 2, 10, 30)
+        tasks = [main.Task(1, "Лабораторная; часть 1, отчёт", deadline, "Сдать\nотчёт " + "длинный текст " * 20,
+                           "Физика, лаб.", "in_progress", 3, main.Recurrence(14, 5)),
+                 main.Task(2, "Эссе", deadline + timedelta(days=3), "План", "История")]
+        main.write_ics(self.path, tasks, [])
+        records = [main.ics_task_record(properties) for component, properties in self.read()]
+        self.assertEqual(records, [(task.title, task.deadline, task.task_name, task.subject, task.column,
+                                    task.effort, task.recurrence) for task in tasks])
+        with open(self.path, encoding="utf-8", newline="") as f:
+            self.assertTrue(all(len(line.encode("utf-8")) <= 77 for line in f))  # 75 байт и CRLF
+
+    def test_categories_split_on_unescaped_commas(self):
+        with open(self.path, "w", encoding="utf-8", newline="") as f:
+            f.write("BEGIN:VCALENDAR\r\nBEGIN:VTODO\r\nSUMMARY:Задача\r\nDUE:20300902T100000\r\n"
+                    "CATEGORIES:Физика\\, лаб.,Учёба\r\nEND:VTODO\r\nEND:VCALENDAR\r\n")
+        (component, properties), = self.read()
+        self.assertEqual(main.ics_task_record(properties)[3], "Физика, лаб.")
+
+    def test_skips_nested_components_and_unfolds_lines(self):
+        with open(self.path, "w", encoding="utf-8", newline="") as f:
+            f.write("BEGIN:VCALENDAR\r\nBEGIN:VEVENT\r\nDTSTART:20300902T090000\r\nDTEND:20300902T103000\r\n"
+                    "SUMMARY:Матем\r\n атический анализ\r\nLOCATION:ауд. 101\r\n"
+                    "BEGIN:VALARM\r\nSUMMARY:Напоминание\r\nEND:VALARM\r\nEND:VEVENT\r\nEND:VCALENDAR\r\n")
+        (component, properties), = self.read()
+        self.assertEqual(component, "VEVENT")
+        self.assertEqual(main.ics_note_row(properties), ("2030-09-02", "09:00–10:30 Математический анализ (ауд. 101)"))
+
+    def test_note_round_trip(self):
+        notes = [("2030-10-10", "Контрольная\nпринести калькулятор, линейку"), ("2030-10-11", "Экскурсия")]
+        main.write_ics(self.path, [], notes)
+        self.assertEqual([main.ics_note_row(properties) for component, properties in self.read()], notes)
+
+
+if __name__ == "__main__":
+    unittest.main()